@@ -0,0 +1,75 @@
+"""memory of the pending tasks.
+
+Report the bytes held by each delayed task waiting for its timer, and each ready task waiting behind a busy worker.
+
+Usage: python benchmarks/memory.py [task_count]
+"""
+import gc
+import logging
+import os
+import sys
+import threading
+import tracemalloc
+from typing import Dict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pynoticenter import PyNotiCenter, PyNotiOptions  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def noop(*args):
+    pass
+
+
+def bytes_per_pending_task(task_count: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="memory"))
+    release_event = threading.Event()
+    started_event = threading.Event()
+
+    def block():
+        started_event.set()
+        release_event.wait()
+
+    # start the worker and the scheduler first, keep their setup out of the measure.
+    queue.post_task(block)
+    started_event.wait()
+    queue.post_task_with_delay(3600, noop)
+    result: Dict[str, float] = {"tasks": task_count}
+
+    gc.collect()
+    tracemalloc.start()
+    task_ids = [queue.post_task_with_delay(3600, noop, i) for i in range(task_count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["delayed_task_bytes"] = current / task_count
+    for task_id in task_ids:
+        queue.cancel_task(task_id)
+    task_ids.clear()
+
+    gc.collect()
+    tracemalloc.start()
+    for i in range(task_count):
+        queue.post_task(noop, i)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result["ready_task_bytes"] = current / task_count
+
+    release_event.set()
+    center.shutdown(wait=False)
+    return result
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    result = bytes_per_pending_task(task_count)
+    print(
+        f"pending tasks: count {task_count}, delayed task {result['delayed_task_bytes']:.0f} bytes, "
+        f"ready task {result['ready_task_bytes']:.0f} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
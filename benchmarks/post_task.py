@@ -0,0 +1,51 @@
+"""post_task throughput and enqueue-to-start latency.
+
+Usage: python benchmarks/post_task.py [task_count]
+"""
+import logging
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pynoticenter import PyNotiCenter, PyNotiOptions  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def percentile(values: List[float], p: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * p / 100.0))
+    return values[index]
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="bench"))
+    latencies: List[float] = []
+    finish_time: List[float] = [0.0]
+
+    def fn(post_time: float):
+        finish_time[0] = time.perf_counter()
+        latencies.append(finish_time[0] - post_time)
+
+    begin_time = time.perf_counter()
+    for _ in range(task_count):
+        queue.post_task(fn, time.perf_counter())
+    center.wait_until_task_complete()
+    total_time = finish_time[0] - begin_time
+    center.shutdown(wait=True)
+
+    print(f"tasks: {task_count}")
+    print(f"throughput: {task_count / total_time:.0f} tasks/sec")
+    for p in (50, 90, 99):
+        print(f"latency p{p}: {percentile(latencies, p) * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
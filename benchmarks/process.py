@@ -0,0 +1,43 @@
+"""pass large bytes arguments to a process pool, through the pipe vs through shared memory.
+
+Usage: python benchmarks/process.py [task_count] [size_mib]
+"""
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pynoticenter.process_executor import PyNotiProcessExecutor  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def checksum(data: bytes) -> int:
+    return data[0] + data[-1] + len(data)
+
+
+def run(name: str, executor: PyNotiProcessExecutor, task_count: int, data: bytes):
+    # warm up the worker processes.
+    executor.submit(checksum, b"warmup").result()
+    begin_time = time.perf_counter()
+    futures = [executor.submit(checksum, data) for _ in range(task_count)]
+    for future in futures:
+        future.result()
+    total_time = time.perf_counter() - begin_time
+    executor.shutdown()
+    size = len(data) * task_count / 1024 / 1024
+    print(f"{name}: tasks {task_count}, {task_count / total_time:.1f} tasks/sec, {size / total_time:.0f} MiB/sec")
+
+
+def main():
+    task_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    data = os.urandom(size * 1024 * 1024)
+    run("pipe", PyNotiProcessExecutor(2, shared_memory_threshold=sys.maxsize), task_count, data)
+    run("shared memory", PyNotiProcessExecutor(2), task_count, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""benchmark suite, machine-readable results to compare across releases.
+
+Measure post_task throughput and enqueue-to-execute latency from one and many producer threads,
+notify_observers fan-out by observer count, post_task_with_delay arm/cancel, wait_until_task_complete
+wakeup latency, shutdown time with N task queues and the bytes per pending task.
+
+Usage: python benchmarks/suite.py [--scale 1.0] [--output results.json] [--baseline old.json] [--only name ...]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pynoticenter  # noqa: E402
+from memory import bytes_per_pending_task  # noqa: E402
+from pynoticenter import PyNotiCenter, PyNotiOptions  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+
+SCHEMA_VERSION = 1
+
+
+def percentile(values: List[float], p: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * p / 100.0))
+    return values[index]
+
+
+def latency_metrics(latencies: List[float]) -> Dict[str, float]:
+    return {f"latency_p{p}_ms": percentile(latencies, p) * 1000 for p in (50, 90, 99)}
+
+
+def noop(*args: Any, **kwargs: Any):
+    pass
+
+
+def bench_post_task(task_count: int, producers: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="bench"))
+    latencies: List[float] = []
+    finish_time: List[float] = [0.0]
+
+    def fn(post_time: float):
+        finish_time[0] = time.perf_counter()
+        latencies.append(finish_time[0] - post_time)
+
+    def produce(count: int):
+        for _ in range(count):
+            queue.post_task(fn, time.perf_counter())
+
+    counts = [task_count // producers + (1 if i < task_count % producers else 0) for i in range(producers)]
+    threads = [threading.Thread(target=produce, args=(count,)) for count in counts]
+    begin_time = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    post_time = time.perf_counter() - begin_time
+    center.wait_until_task_complete()
+    total_time = finish_time[0] - begin_time
+    center.shutdown(wait=True)
+    result = {
+        "tasks": task_count,
+        "producers": producers,
+        "post_per_sec": task_count / post_time,
+        "throughput_per_sec": task_count / total_time,
+    }
+    result.update(latency_metrics(latencies))
+    return result
+
+
+def bench_fanout(observer_count: int, notify_count: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    options = PyNotiOptions(queue="observers")
+    delivered: List[int] = [0]
+
+    def on_notify(value: int):
+        delivered[0] += 1
+
+    for _ in range(observer_count):
+        # distinct callables, so remove_observer and weak observers are not involved.
+        center.add_observer("bench", lambda value: on_notify(value), options=options)
+    begin_time = time.perf_counter()
+    for i in range(notify_count):
+        center.notify_observers("bench", i)
+    notify_time = time.perf_counter() - begin_time
+    center.wait_until_task_complete()
+    total_time = time.perf_counter() - begin_time
+    center.shutdown(wait=True)
+    return {
+        "observers": observer_count,
+        "notifications": notify_count,
+        "notify_us": notify_time / notify_count * 1000000,
+        "deliveries_per_sec": delivered[0] / total_time,
+    }
+
+
+def bench_delay_arm_cancel(task_count: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    begin_time = time.perf_counter()
+    task_ids = [center.post_task_with_delay(60, noop) for _ in range(task_count)]
+    arm_time = time.perf_counter() - begin_time
+    begin_time = time.perf_counter()
+    for task_id in task_ids:
+        center.cancel_task(task_id)
+    cancel_time = time.perf_counter() - begin_time
+    remain = center.get_default_task_queue().task_count
+    center.shutdown(wait=True)
+    return {
+        "tasks": task_count,
+        "arm_per_sec": task_count / arm_time,
+        "cancel_per_sec": task_count / cancel_time,
+        "remain": remain,
+    }
+
+
+def bench_wait_wakeup(rounds: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    latencies: List[float] = []
+    finish_time: List[float] = [0.0]
+
+    def fn():
+        time.sleep(0.001)
+        finish_time[0] = time.perf_counter()
+
+    for _ in range(rounds):
+        center.post_task(fn)
+        center.wait_until_task_complete()
+        latencies.append(time.perf_counter() - finish_time[0])
+    center.shutdown(wait=True)
+    result: Dict[str, float] = {"rounds": rounds}
+    result.update(latency_metrics(latencies))
+    return result
+
+
+def bench_shutdown(queue_count: int) -> Dict[str, float]:
+    center = PyNotiCenter()
+    for i in range(queue_count):
+        center.post_task_to_task_queue(f"queue-{i}", time.sleep, 0.01)
+    begin_time = time.perf_counter()
+    center.shutdown(wait=True)
+    return {"queues": queue_count, "shutdown_ms": (time.perf_counter() - begin_time) * 1000}
+
+
+def scaled(value: int, scale: float) -> int:
+    return max(int(value * scale), 1)
+
+
+def benchmarks(scale: float) -> Dict[str, Callable[[], Dict[str, float]]]:
+    cases: Dict[str, Callable[[], Dict[str, float]]] = {
+        "post_task.producers_1": lambda: bench_post_task(scaled(20000, scale), 1),
+        "post_task.producers_4": lambda: bench_post_task(scaled(20000, scale), 4),
+    }
+    for observer_count in (1, 10, 100, 1000):
+        notify_count = scaled(max(20000 // observer_count, 20), scale)
+        cases[f"fanout.observers_{observer_count}"] = (
+            lambda observer_count=observer_count, notify_count=notify_count: bench_fanout(
+                observer_count, notify_count
+            )
+        )
+    cases["delay.arm_cancel"] = lambda: bench_delay_arm_cancel(scaled(100000, scale))
+    cases["wait_until_task_complete.wakeup"] = lambda: bench_wait_wakeup(scaled(200, scale))
+    for queue_count in (10, 100):
+        cases[f"shutdown.queues_{queue_count}"] = lambda queue_count=queue_count: bench_shutdown(queue_count)
+    cases["memory.pending_task"] = lambda: bytes_per_pending_task(scaled(100000, scale))
+    return cases
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "schema": SCHEMA_VERSION,
+        "pynoticenter": pynoticenter.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]):
+    print(f"compare with baseline pynoticenter {baseline['environment'].get('pynoticenter')}:")
+    for name, metrics in current["results"].items():
+        old_metrics = baseline["results"].get(name)
+        if old_metrics is None:
+            continue
+        for key, value in metrics.items():
+            old_value = old_metrics.get(key)
+            if not isinstance(old_value, (int, float)) or old_value == 0:
+                continue
+            change = (value - old_value) / old_value * 100
+            print(f"  {name}.{key}: {old_value:.3f} -> {value:.3f} ({change:+.1f}%)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="pynoticenter benchmark suite")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the task counts")
+    parser.add_argument("--output", help="write the results JSON to file instead of stdout")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare with")
+    parser.add_argument("--only", nargs="*", default=None, help="run the benchmarks with these name prefixes")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, case in benchmarks(args.scale).items():
+        if args.only is not None and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        print(f"running {name}", file=sys.stderr)
+        results[name] = case()
+    report = {"environment": environment(), "results": results}
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as fp:
+            json.dump(report, fp, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as fp:
+            compare(json.load(fp), report)
+
+
+if __name__ == "__main__":
+    main()
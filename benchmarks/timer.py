@@ -0,0 +1,105 @@
+"""arm and cancel delayed timers at scale.
+
+Compare asyncio call_later with PyNotiTimerWheel, then post_task_with_delay/cancel_task through PyNotiCenter.
+
+Usage: python benchmarks/timer.py [timer_count] [task_count]
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from pynoticenter import PyNotiCenter  # noqa: E402
+from pynoticenter.timer_wheel import PyNotiTimerWheel  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+
+
+def noop():
+    pass
+
+
+def asyncio_arm_cancel(count: int) -> Tuple[float, float, int]:
+    loop = asyncio.new_event_loop()
+
+    async def run() -> Tuple[float, float, int]:
+        begin_time = time.perf_counter()
+        handles = [loop.call_later(60, noop) for _ in range(count)]
+        arm_time = time.perf_counter() - begin_time
+        begin_time = time.perf_counter()
+        for handle in handles:
+            handle.cancel()
+        cancel_time = time.perf_counter() - begin_time
+        # cancelled handles stay in the loop heap until the loop runs a cleanup pass.
+        return arm_time, cancel_time, len(loop._scheduled)  # type: ignore
+
+    result = loop.run_until_complete(run())
+    loop.close()
+    return result
+
+
+def wheel_arm_cancel(count: int) -> Tuple[float, float, int]:
+    loop = asyncio.new_event_loop()
+    wheel = PyNotiTimerWheel(loop)
+    begin_time = time.perf_counter()
+    handles = [wheel.arm(60, noop) for _ in range(count)]
+    arm_time = time.perf_counter() - begin_time
+    begin_time = time.perf_counter()
+    for handle in handles:
+        handle.cancel()
+    cancel_time = time.perf_counter() - begin_time
+    remain = wheel.timer_count
+    loop.close()
+    return arm_time, cancel_time, remain
+
+
+def center_post_cancel(count: int) -> Tuple[float, float, int]:
+    center = PyNotiCenter()
+    begin_time = time.perf_counter()
+    task_ids = [center.post_task_with_delay(60, noop) for _ in range(count)]
+    arm_time = time.perf_counter() - begin_time
+    begin_time = time.perf_counter()
+    for task_id in task_ids:
+        center.cancel_task(task_id)
+    cancel_time = time.perf_counter() - begin_time
+    remain = center.get_default_task_queue().task_count
+    center.shutdown(wait=True)
+    return arm_time, cancel_time, remain
+
+
+def peak_memory(fn: Callable[[int], Any], count: int) -> float:
+    tracemalloc.start()
+    fn(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def report(name: str, fn: Callable[[int], Tuple[float, float, int]], count: int):
+    arm_time, cancel_time, remain = fn(count)
+    peak = peak_memory(fn, count)
+    print(
+        f"{name}: count {count}, arm {count / arm_time:.0f}/sec, cancel {count / cancel_time:.0f}/sec, "
+        f"remain after cancel {remain}, peak memory {peak:.1f} MiB"
+    )
+
+
+def main():
+    timer_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    task_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    results: List[Tuple[str, Callable[[int], Tuple[float, float, int]], int]] = [
+        ("asyncio call_later", asyncio_arm_cancel, timer_count),
+        ("PyNotiTimerWheel", wheel_arm_cancel, timer_count),
+        ("post_task_with_delay", center_post_cancel, task_count),
+    ]
+    for name, fn, count in results:
+        report(name, fn, count)
+
+
+if __name__ == "__main__":
+    main()
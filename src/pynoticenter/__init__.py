@@ -1,9 +1,31 @@
 """pynoticenter modules"""
+from .metrics import PyNotiHistogramSnapshot, PyNotiQueueMetricsSnapshot
 from .noticenter import PyNotiCenter, PyNotiCenterInterface
-from .options import PyNotiOptions
+from .options import PyNotiOptions, PyNotiOverflowPolicy
+from .shutdown_report import PyNotiDroppedTask, PyNotiShutdownReport
 from .task import PyNotiTask
-from .task_queue import PyNotiTaskQueue
+from .task_handle import PyNotiTaskHandle
+from .task_queue import PyNotiQueueFullError, PyNotiTaskQueue
+from .trace_recorder import PyNotiTraceRecorder
+from .tracing import PyNotiSlowTask, PyNotiTaskTrace, PyNotiTraceHooks
 
 __version__ = "0.1.11"
 
-__all__ = ["PyNotiCenter", "PyNotiCenterInterface", "PyNotiOptions", "PyNotiTask", "PyNotiTaskQueue"]
+__all__ = [
+    "PyNotiCenter",
+    "PyNotiCenterInterface",
+    "PyNotiDroppedTask",
+    "PyNotiHistogramSnapshot",
+    "PyNotiOptions",
+    "PyNotiOverflowPolicy",
+    "PyNotiQueueFullError",
+    "PyNotiQueueMetricsSnapshot",
+    "PyNotiShutdownReport",
+    "PyNotiSlowTask",
+    "PyNotiTask",
+    "PyNotiTaskHandle",
+    "PyNotiTaskQueue",
+    "PyNotiTaskTrace",
+    "PyNotiTraceRecorder",
+    "PyNotiTraceHooks",
+]
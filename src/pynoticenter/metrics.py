@@ -0,0 +1,110 @@
+import bisect
+import math
+from dataclasses import dataclass
+from typing import List, Tuple
+
+PYNOTI_TIME_BUCKETS: Tuple[float, ...] = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    math.inf,
+)
+
+
+@dataclass(frozen=True)
+class PyNotiHistogramSnapshot:
+    # counts[i] is the number of values in (buckets[i - 1], buckets[i]], in seconds.
+    buckets: Tuple[float, ...]
+    counts: Tuple[int, ...]
+    count: int
+    total: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count > 0 else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """upper bound of the bucket holding the percentile, 0 <= percent <= 100."""
+        if self.count == 0:
+            return 0.0
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        accumulated = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return bucket
+        return self.buckets[-1]
+
+
+class PyNotiHistogram:
+    """PyNotiHistogram, fixed bucket histogram. Not thread safety, only one thread observes."""
+
+    __slots__ = ("__buckets", "__counts", "__count", "__total")
+
+    def __init__(self, buckets: Tuple[float, ...] = PYNOTI_TIME_BUCKETS):
+        self.__buckets: Tuple[float, ...] = buckets
+        self.__counts: List[int] = [0] * len(buckets)
+        self.__count: int = 0
+        self.__total: float = 0.0
+
+    def observe(self, value: float):
+        self.__counts[bisect.bisect_left(self.__buckets, value)] += 1
+        self.__count += 1
+        self.__total += value
+
+    def snapshot(self) -> PyNotiHistogramSnapshot:
+        return PyNotiHistogramSnapshot(self.__buckets, tuple(self.__counts), self.__count, self.__total)
+
+
+@dataclass(frozen=True)
+class PyNotiQueueMetricsSnapshot:
+    queue: str
+    posted: int
+    executed: int
+    cancelled: int
+    failed: int
+    depth: int
+    max_depth: int
+    # from the task is ready to run, to the task starts.
+    wait_time: PyNotiHistogramSnapshot
+    run_time: PyNotiHistogramSnapshot
+
+
+class PyNotiQueueMetrics:
+    """PyNotiQueueMetrics, counters and histograms of a task queue.
+
+    The counters of posted and cancelled tasks and the depth are updated with the task queue lock held,
+    the others by the worker thread only, so no lock of its own. A snapshot may be slightly inconsistent.
+    """
+
+    __slots__ = ("posted", "executed", "cancelled", "failed", "max_depth", "wait_time", "run_time")
+
+    def __init__(self):
+        self.posted: int = 0
+        self.executed: int = 0
+        self.cancelled: int = 0
+        self.failed: int = 0
+        self.max_depth: int = 0
+        self.wait_time: PyNotiHistogram = PyNotiHistogram()
+        self.run_time: PyNotiHistogram = PyNotiHistogram()
+
+    def snapshot(self, queue: str, depth: int) -> PyNotiQueueMetricsSnapshot:
+        return PyNotiQueueMetricsSnapshot(
+            queue,
+            self.posted,
+            self.executed,
+            self.cancelled,
+            self.failed,
+            depth,
+            self.max_depth,
+            self.wait_time.snapshot(),
+            self.run_time.snapshot(),
+        )
@@ -1,25 +1,36 @@
 import asyncio
 import logging
 import threading
+import time
 from abc import ABC, abstractmethod
 from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from pynoticenter.noticenter_observer import PyNotiObserver, PyNotiObserverCollection
+from pynoticenter import utils
+from pynoticenter.metrics import PyNotiQueueMetricsSnapshot
+from pynoticenter.noticenter_observer import PyNotiObserverCollection, PyNotiObserverGroup
 from pynoticenter.options import PyNotiOptions
-from pynoticenter.task_queue import PyNotiTaskQueue
+from pynoticenter.shutdown_report import PyNotiDroppedTask, PyNotiShutdownReport
+from pynoticenter.task_handle import PyNotiTaskHandle
+from pynoticenter.task_queue import PyNotiQueueFullError, PyNotiTaskQueue
+from pynoticenter.timer_wheel import PYNOTI_TIMER_RESOLUTION, PyNotiTimerWheel
+from pynoticenter.topic_trie import PYNOTI_TOPIC_CACHE_SIZE, PyNotiTopicTrie, is_topic_pattern
+from pynoticenter.trace_recorder import PYNOTI_TRACE_CAPACITY, PyNotiTraceRecorder
+from pynoticenter.tracing import PyNotiSlowTask, PyNotiSlowTaskWatchdog, PyNotiTraceHooks
+from pynoticenter.worker_pool import PyNotiWorkerPool
 
 
 class PyNotiCenterInterface(ABC):
     """PyNotiCenter Interface"""
 
     @abstractmethod
-    def post_task(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    def post_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> str:
         """post task to default task queue.
 
         Args:
             fn (Callable[..., None]): callback function
             *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
             **kwargs (Any): kwargs
 
         Returns:
@@ -28,13 +39,16 @@ class PyNotiCenterInterface(ABC):
         pass
 
     @abstractmethod
-    def post_task_with_delay(self, delay: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    def post_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> str:
         """post task to default task queue with delay.
 
         Args:
             fn (Callable[..., None]): callback function
             delay (float): delay time in seconds.
             *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
             **kwargs (Any): kwargs
 
         Returns:
@@ -43,13 +57,16 @@ class PyNotiCenterInterface(ABC):
         pass
 
     @abstractmethod
-    def post_task_to_task_queue(self, queue_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    def post_task_to_task_queue(
+        self, queue_name: str, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> str:
         """post task to named task queue.
 
         Args:
             fn (Callable[..., None]): callback function
             queue_name (str): queue name, create from create_task_queue
             *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
             **kwargs (Any): kwargs
 
         Returns:
@@ -57,6 +74,92 @@ class PyNotiCenterInterface(ABC):
         """
         pass
 
+    @abstractmethod
+    def submit_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> PyNotiTaskHandle:
+        """post task to default task queue and return a result handle.
+
+        Args:
+            fn (Callable[..., Any]): callback function
+            *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
+            **kwargs (Any): kwargs
+
+        Returns:
+            PyNotiTaskHandle: concurrent.futures.Future of the fn result, awaitable and cancellable
+        """
+        pass
+
+    @abstractmethod
+    def submit_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> PyNotiTaskHandle:
+        """post task to default task queue with delay and return a result handle.
+
+        Args:
+            delay (float): delay time in seconds.
+            fn (Callable[..., Any]): callback function
+            *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
+            **kwargs (Any): kwargs
+
+        Returns:
+            PyNotiTaskHandle: concurrent.futures.Future of the fn result, awaitable and cancellable
+        """
+        pass
+
+    @abstractmethod
+    def submit_task_to_task_queue(
+        self, queue_name: str, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> PyNotiTaskHandle:
+        """post task to named task queue and return a result handle.
+
+        Args:
+            queue_name (str): queue name, create from create_task_queue
+            fn (Callable[..., Any]): callback function
+            *args (Any): args
+            priority (int): task priority, the higher priority task is executed first. default 0.
+            **kwargs (Any): kwargs
+
+        Returns:
+            PyNotiTaskHandle: concurrent.futures.Future of the fn result, awaitable and cancellable
+        """
+        pass
+
+    @abstractmethod
+    def post_tasks(
+        self, tasks: Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]], *, priority: int = 0
+    ) -> List[str]:
+        """post many tasks to default task queue at once.
+
+        Args:
+            tasks (Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]]): (fn, args, kwargs) items
+            priority (int): priority of all the tasks. default 0.
+
+        Returns:
+            List[str]: return task ids, in the same order as tasks
+        """
+        pass
+
+    @abstractmethod
+    def post_tasks_to_task_queue(
+        self,
+        queue_name: str,
+        tasks: Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]],
+        *,
+        priority: int = 0,
+    ) -> List[str]:
+        """post many tasks to named task queue at once.
+
+        Args:
+            queue_name (str): queue name, create from create_task_queue
+            tasks (Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]]): (fn, args, kwargs) items
+            priority (int): priority of all the tasks. default 0.
+
+        Returns:
+            List[str]: return task ids, in the same order as tasks
+        """
+        pass
+
     @abstractmethod
     def cancel_task(self, task_id: str) -> None:
         """cancel task from default task queue with task id
@@ -79,20 +182,105 @@ class PyNotiCenterInterface(ABC):
         pass
 
     @abstractmethod
-    def wait_until_task_complete(self):
-        """wait until all task complete. it will block until there is no task."""
+    def wait_until_task_complete(self, timeout: Optional[float] = None) -> bool:
+        """wait until all task complete. it will block until there is no task.
+
+        Args:
+            timeout (Optional[float]): max seconds to wait, None means wait forever.
+
+        Returns:
+            bool: True if all task complete, False on timeout.
+        """
+        pass
+
+    @abstractmethod
+    async def wait_until_task_complete_async(self, timeout: Optional[float] = None) -> bool:
+        """awaitable wait_until_task_complete, it does not block the event loop.
+
+        Args:
+            timeout (Optional[float]): max seconds to wait, None means wait forever.
+
+        Returns:
+            bool: True if all task complete, False on timeout.
+        """
+        pass
+
+    @abstractmethod
+    def add_trace_hooks(self, hooks: PyNotiTraceHooks) -> None:
+        """add hooks called before and after each task of all the task queues, on the worker thread.
+
+        Args:
+            hooks (PyNotiTraceHooks): before, after and error hooks, called with PyNotiTaskTrace.
+        """
+        pass
+
+    @abstractmethod
+    def remove_trace_hooks(self, hooks: PyNotiTraceHooks) -> None:
+        """remove hooks added by add_trace_hooks
+
+        Args:
+            hooks (PyNotiTraceHooks): hooks
+        """
         pass
 
     @abstractmethod
-    def shutdown(self, wait: bool):
+    def set_slow_task_watchdog(
+        self, threshold: float, callback: Optional[Callable[[PyNotiSlowTask], None]] = None
+    ) -> None:
+        """report the tasks running longer than threshold, with the stack of the worker thread.
+
+        Args:
+            threshold (float): seconds, 0 disables the watchdog.
+            callback (Optional[Callable[[PyNotiSlowTask], None]]): called once per slow task on the watchdog
+                thread. None means log a warning.
+        """
+        pass
+
+    @abstractmethod
+    def start_trace_recording(self, capacity: int = PYNOTI_TRACE_CAPACITY) -> PyNotiTraceRecorder:
+        """record the post, schedule, start and finish events of the tasks of all the task queues.
+
+        Args:
+            capacity (int): size of the ring buffer, the oldest events are overwritten once it is full.
+
+        Returns:
+            PyNotiTraceRecorder: recorder, dump it as Chrome trace JSON which Perfetto opens.
+        """
+        pass
+
+    @abstractmethod
+    def stop_trace_recording(self) -> Optional[PyNotiTraceRecorder]:
+        """stop recording.
+
+        Returns:
+            Optional[PyNotiTraceRecorder]: the recorder holding the recorded events, None if not recording.
+        """
+        pass
+
+    @abstractmethod
+    def get_metrics(self) -> List[PyNotiQueueMetricsSnapshot]:
+        """metrics snapshot of all the task queues, default task queue first.
+
+        Returns:
+            List[PyNotiQueueMetricsSnapshot]: posted, executed, cancelled and failed task counters, depth,
+                max depth, and the wait time and run time histograms of each task queue.
+        """
+        pass
+
+    @abstractmethod
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> PyNotiShutdownReport:
         """shutdown PyNotiCenter. Once shutdown, you can't call it anymore.
 
         When shutdown is called, you can not post new task to task queue, all task queue will ignore the new task.
         When wait is setted, it will block until all task complete, if not set, all task queue will shutdown as fast as possible.
+        All task queues are terminated at once and waited together.
 
         Args:
             wait (bool): set wait for task complete or not.
+            timeout (Optional[float]): with wait, max seconds to wait. the tasks left at the deadline are dropped.
 
+        Returns:
+            PyNotiShutdownReport: the dropped tasks, and whether shutdown completed before the deadline.
         """
         pass
 
@@ -143,15 +331,25 @@ class PyNotiCenterInterface(ABC):
 
     @abstractmethod
     def add_observer(
-        self, name: str, fn: Callable[..., Any], receiver: Any = None, *, options: Optional[PyNotiOptions] = None
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        receiver: Any = None,
+        *,
+        options: Optional[PyNotiOptions] = None,
+        weak: bool = False,
     ) -> None:
         """Add observer to PyNotiCenter
 
         Args:
-            name (str): notification name
+            name (str): notification name, or topic pattern. dot separated segments, '*' matches one segment,
+                '#' matches zero or more segments, e.g. "order.*", "market.#".
             fn (Callable[..., None]): callback function
             receiver (Any): receiver object
-            options (Optional[PyNotiOptions]): options
+            options (Optional[PyNotiOptions]): options. target task queue, and coalesce, reducer,
+                debounce or throttle to merge the notifications still waiting in the task queue.
+            weak (bool): hold the receiver and the bound method fn by weak reference. the observer is removed
+                once the receiver or the object of the method is garbage collected.
         """
         pass
 
@@ -182,7 +380,7 @@ class PyNotiCenterInterface(ABC):
 
     @abstractmethod
     def notify_observers(self, name: str, *args: Any, **kwargs: Any) -> None:
-        """Notify observers
+        """Notify observers, including the observers of the topic patterns which match name.
 
         Args:
             name (str): notification name
@@ -203,17 +401,36 @@ class PyNotiCenter(PyNotiCenterInterface):
     global __default_global_lock
     __default_global_lock = threading.RLock()
 
-    def __init__(self):
+    def __init__(self, *, timer_resolution: float = PYNOTI_TIMER_RESOLUTION, worker_threads: Optional[int] = None):
+        """create PyNotiCenter.
+
+        Args:
+            timer_resolution (float): tick resolution in seconds of the delayed task timer.
+            worker_threads (Optional[int]): None, each task queue has its own thread. Otherwise all task queues
+                are multiplexed on a pool of worker_threads event loop threads, 0 means the cpu count.
+        """
         self.__lock: threading.RLock = threading.RLock()
         self.__common_thread_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=5)
         self.__scheduler_runloop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
-        self.__scheduler_thread: threading.Thread = threading.Thread(target=self.__scheduler_thread__)
-        self.__default_queue: PyNotiTaskQueue = PyNotiTaskQueue(
-            None, self.__scheduler_runloop, self.__common_thread_pool
+        self.__timer_wheel: PyNotiTimerWheel = PyNotiTimerWheel(self.__scheduler_runloop, timer_resolution)
+        self.__worker_pool: Optional[PyNotiWorkerPool] = (
+            PyNotiWorkerPool(worker_threads) if worker_threads is not None else None
         )
+        self.__scheduler_thread: threading.Thread = threading.Thread(target=self.__scheduler_thread__)
+        # center wide idle condition, maintained by the task queues when they turn busy or empty.
+        self.__idle_condition: threading.Condition = threading.Condition(threading.Lock())
+        self.__busy_queue_count: int = 0
+        self.__idle_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self.__global_trace_hooks: Tuple[PyNotiTraceHooks, ...] = ()
+        self.__watchdog: Optional[PyNotiSlowTaskWatchdog] = None
+        self.__recorder: Optional[PyNotiTraceRecorder] = None
+        self.__default_queue: PyNotiTaskQueue = self.__new_task_queue__(None)
         self.__task_queue_dict: Dict[str, PyNotiTaskQueue] = {}
         self.__unnamed_task_queue: List[PyNotiTaskQueue] = []
         self.__notifications_dict: Dict[str, PyNotiObserverCollection] = {}
+        # wildcard topic patterns, and the cache of topic -> matched observer collections.
+        self.__topic_trie: PyNotiTopicTrie = PyNotiTopicTrie()
+        self.__topic_cache: Dict[str, Tuple[PyNotiObserverCollection, ...]] = {}
         self.__scheduler_thread.start()
 
         self.__is_shutdown: bool = False
@@ -227,23 +444,52 @@ class PyNotiCenter(PyNotiCenterInterface):
                 __default_global_instance = PyNotiCenter()
         return __default_global_instance
 
-    def post_task(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
-        return self.post_task_with_delay(0, fn, *args, **kwargs)
+    def post_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> str:
+        return self.post_task_with_delay(0, fn, *args, priority=priority, **kwargs)
 
-    def post_task_with_delay(self, delay: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    def post_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> str:
         with self.__lock:
-            return self.__default_queue.post_task_with_delay(delay, fn, *args, **kwargs)
+            return self.__default_queue.post_task_with_delay(delay, fn, *args, priority=priority, **kwargs)
 
-    def post_task_to_task_queue(self, queue_name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
+    def post_task_to_task_queue(
+        self, queue_name: str, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> str:
+        # resolve the queue under the lock, but post outside, a bounded queue may block the producer.
+        q = self.__get_or_create_task_queue__(queue_name)
+        return q.post_task(fn, *args, priority=priority, **kwargs)
+
+    def submit_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> PyNotiTaskHandle:
+        return self.submit_task_with_delay(0, fn, *args, priority=priority, **kwargs)
+
+    def submit_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> PyNotiTaskHandle:
         with self.__lock:
-            q: Optional[PyNotiTaskQueue] = None
-            try:
-                q = self.get_task_queue(queue_name)
-            except:
-                q = self.create_task_queue(PyNotiOptions(queue=queue_name))
-            if q is not None:
-                return q.post_task(fn, *args, **kwargs)
-        return ""
+            return self.__default_queue.submit_task_with_delay(delay, fn, *args, priority=priority, **kwargs)
+
+    def submit_task_to_task_queue(
+        self, queue_name: str, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> PyNotiTaskHandle:
+        q = self.__get_or_create_task_queue__(queue_name)
+        return q.submit_task(fn, *args, priority=priority, **kwargs)
+
+    def post_tasks(
+        self, tasks: Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]], *, priority: int = 0
+    ) -> List[str]:
+        with self.__lock:
+            return self.__default_queue.post_tasks(tasks, priority=priority)
+
+    def post_tasks_to_task_queue(
+        self,
+        queue_name: str,
+        tasks: Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]],
+        *,
+        priority: int = 0,
+    ) -> List[str]:
+        q = self.__get_or_create_task_queue__(queue_name)
+        return q.post_tasks(tasks, priority=priority)
 
     def cancel_task(self, task_id: str):
         with self.__lock:
@@ -254,30 +500,97 @@ class PyNotiCenter(PyNotiCenterInterface):
         if queue is not None:
             queue.cancel_task(task_id)
 
-    def wait_until_task_complete(self):
-        event = threading.Event()
-        while not event.is_set():
-            wait = False
-            with self.__lock:
-                for q in self.__unnamed_task_queue:
-                    if q.task_count > 0:
-                        wait = True
-                    if wait:
-                        break
-                for _, q in self.__task_queue_dict.items():
-                    if q.task_count > 0:
-                        wait = True
-                    if wait:
-                        break
-                if self.__default_queue.task_count > 0:
-                    wait = True
-            if not wait:
-                event.set()
-            else:
-                event.wait(timeout=0.5)
-
-    def shutdown(self, wait: bool):
-        logging.info(f"PyNotiCenter start shutdown, wait = {wait}")
+    def wait_until_task_complete(self, timeout: Optional[float] = None) -> bool:
+        with self.__idle_condition:
+            return self.__idle_condition.wait_for(lambda: self.__busy_queue_count == 0, timeout)
+
+    async def wait_until_task_complete_async(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        with self.__idle_condition:
+            if self.__busy_queue_count == 0:
+                return True
+            waiter = loop.create_future()
+            self.__idle_waiters.append((loop, waiter))
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self.__idle_condition:
+                if (loop, waiter) in self.__idle_waiters:
+                    self.__idle_waiters.remove((loop, waiter))
+
+    def __on_task_queue_busy__(self, is_busy: bool):
+        # call from task queue with its lock held. keep the count of busy task queues, wake up the waiters at 0.
+        with self.__idle_condition:
+            if is_busy:
+                self.__busy_queue_count += 1
+                return
+            self.__busy_queue_count -= 1
+            if self.__busy_queue_count > 0:
+                return
+            self.__idle_condition.notify_all()
+            for loop, waiter in self.__idle_waiters:
+                loop.call_soon_threadsafe(self.__set_idle_waiter__, waiter)
+            self.__idle_waiters.clear()
+
+    @staticmethod
+    def __set_idle_waiter__(waiter: asyncio.Future):
+        if not waiter.done():
+            waiter.set_result(True)
+
+    def add_trace_hooks(self, hooks: PyNotiTraceHooks):
+        with self.__lock:
+            self.__global_trace_hooks = self.__global_trace_hooks + (hooks,)
+            for q in self.__all_task_queues__():
+                q.set_global_trace_hooks(self.__global_trace_hooks)
+
+    def remove_trace_hooks(self, hooks: PyNotiTraceHooks):
+        with self.__lock:
+            self.__global_trace_hooks = tuple(item for item in self.__global_trace_hooks if item is not hooks)
+            for q in self.__all_task_queues__():
+                q.set_global_trace_hooks(self.__global_trace_hooks)
+
+    def set_slow_task_watchdog(self, threshold: float, callback: Optional[Callable[[PyNotiSlowTask], None]] = None):
+        with self.__lock:
+            old_watchdog = self.__watchdog
+            self.__watchdog = PyNotiSlowTaskWatchdog(threshold, callback) if threshold > 0 else None
+            for q in self.__all_task_queues__():
+                q.set_watchdog(self.__watchdog)
+        if old_watchdog is not None:
+            old_watchdog.stop()
+
+    def start_trace_recording(self, capacity: int = PYNOTI_TRACE_CAPACITY) -> PyNotiTraceRecorder:
+        recorder = PyNotiTraceRecorder(capacity)
+        with self.__lock:
+            self.__recorder = recorder
+            for q in self.__all_task_queues__():
+                q.set_recorder(recorder)
+        return recorder
+
+    def stop_trace_recording(self) -> Optional[PyNotiTraceRecorder]:
+        with self.__lock:
+            recorder = self.__recorder
+            self.__recorder = None
+            for q in self.__all_task_queues__():
+                q.set_recorder(None)
+        return recorder
+
+    def __all_task_queues__(self) -> List[PyNotiTaskQueue]:
+        with self.__lock:
+            task_queues = [self.__default_queue]
+            task_queues.extend(self.__task_queue_dict.values())
+            task_queues.extend(self.__unnamed_task_queue)
+            return task_queues
+
+    def get_metrics(self) -> List[PyNotiQueueMetricsSnapshot]:
+        return [q.get_metrics() for q in self.__all_task_queues__()]
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> PyNotiShutdownReport:
+        logging.info(f"PyNotiCenter start shutdown, wait = {wait}, timeout = {timeout}")
+        begin_time = time.monotonic()
+        deadline = None if timeout is None else begin_time + timeout
         task_queues = list[PyNotiTaskQueue]()
         with self.__lock:
             # mark shutdown
@@ -288,17 +601,36 @@ class PyNotiCenter(PyNotiCenterInterface):
             for _, q in self.__task_queue_dict.items():
                 task_queues.append(q)
             self.__task_queue_dict.clear()
-        # terminate other task queue
+        task_queues.append(self.__default_queue)
+        # signal all the task queues at once, then wait for them together.
+        dropped_tasks: List[PyNotiDroppedTask] = []
         for q in task_queues:
-            q.terminate(wait)
-        # terminate default task queue
-        self.__default_queue.terminate(wait)
+            dropped_tasks.extend(q.signal_terminate(wait))
+        completed = True
+        if wait:
+            for q in task_queues:
+                dropped_tasks.extend(q.wait_terminated(deadline))
+        else:
+            for q in task_queues:
+                utils.RunInThread(q.wait_terminated, None, executor=self.__common_thread_pool)
+        # exit worker pool threads once all the task queues release them
+        if self.__worker_pool is not None:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            completed = self.__worker_pool.shutdown(wait, remaining)
+        with self.__lock:
+            watchdog = self.__watchdog
+            self.__watchdog = None
+        if watchdog is not None:
+            watchdog.stop()
         # exit scheduler thread
         def stop_scheduler_runloop():
             self.__scheduler_runloop.stop()
 
         self.__scheduler_runloop.call_soon_threadsafe(stop_scheduler_runloop)
-        logging.info("PyNotiCenter shutdown end")
+        completed = completed and len(dropped_tasks) == 0 and (deadline is None or time.monotonic() <= deadline)
+        elapsed = time.monotonic() - begin_time
+        logging.info(f"PyNotiCenter shutdown end. elapsed: {elapsed:0.3f} dropped tasks: {len(dropped_tasks)}")
+        return PyNotiShutdownReport(completed, elapsed, dropped_tasks)
 
     def release_task_queue(self, queue_name: str, wait: bool):
         if queue_name is None:
@@ -315,8 +647,8 @@ class PyNotiCenter(PyNotiCenterInterface):
                 raise ValueError("PyNotiCenter is shutdown, can not create task queue.")
 
         if options.queue is None:
-            queue = PyNotiTaskQueue(options.queue, self.__scheduler_runloop, self.__common_thread_pool)
-            queue.set_fn_with_task_id(options.fn_with_task_id)
+            queue = self.__new_task_queue__(options.queue)
+            self.__configure_task_queue__(queue, options)
             with self.__lock:
                 self.__unnamed_task_queue.append(queue)
                 self.__unnamed_task_queue = [queue for queue in self.__unnamed_task_queue if not queue.is_terminated]
@@ -326,12 +658,41 @@ class PyNotiCenter(PyNotiCenterInterface):
             if options.queue in self.__task_queue_dict:
                 return self.__task_queue_dict[options.queue]
 
-        queue = PyNotiTaskQueue(options.queue, self.__scheduler_runloop, self.__common_thread_pool)
-        queue.set_fn_with_task_id(options.fn_with_task_id)
+        queue = self.__new_task_queue__(options.queue)
+        self.__configure_task_queue__(queue, options)
         with self.__lock:
             self.__task_queue_dict[options.queue] = queue
         return queue
 
+    def __new_task_queue__(self, queue_name: Optional[str]) -> PyNotiTaskQueue:
+        queue = PyNotiTaskQueue(
+            queue_name,
+            self.__scheduler_runloop,
+            self.__common_thread_pool,
+            self.__timer_wheel,
+            self.__worker_pool,
+            self.__on_task_queue_busy__,
+        )
+        queue.set_global_trace_hooks(self.__global_trace_hooks)
+        queue.set_watchdog(self.__watchdog)
+        queue.set_recorder(self.__recorder)
+        return queue
+
+    def __get_or_create_task_queue__(self, queue_name: str, options: Optional[PyNotiOptions] = None) -> PyNotiTaskQueue:
+        with self.__lock:
+            try:
+                return self.get_task_queue(queue_name)
+            except:
+                return self.create_task_queue(options if options is not None else PyNotiOptions(queue=queue_name))
+
+    def __configure_task_queue__(self, queue: PyNotiTaskQueue, options: PyNotiOptions):
+        queue.set_fn_with_task_id(options.fn_with_task_id)
+        queue.set_max_batch(options.max_batch)
+        queue.set_max_pending(options.max_pending, options.overflow_policy, options.overflow_timeout)
+        queue.set_max_concurrency(options.max_concurrency)
+        queue.set_executor(options.executor, options.workers)
+        queue.set_idle_timeout(options.idle_timeout)
+
     def get_default_task_queue(self) -> PyNotiTaskQueue:
         with self.__lock:
             return self.__default_queue
@@ -364,6 +725,7 @@ class PyNotiCenter(PyNotiCenterInterface):
         receiver: Optional[Any] = None,
         *,
         options: Optional[PyNotiOptions] = None,
+        weak: bool = False,
     ):
         with self.__lock:
             observer_collection: Optional[PyNotiObserverCollection] = None
@@ -372,40 +734,114 @@ class PyNotiCenter(PyNotiCenterInterface):
 
             if observer_collection is None:
                 observer_collection = PyNotiObserverCollection(name, self.__notification_scheduler__)
+                # copy on write, notify_observers reads the dict without lock.
+                notifications_dict = dict(self.__notifications_dict)
+                notifications_dict[name] = observer_collection
+                self.__notifications_dict = notifications_dict
+                if is_topic_pattern(name):
+                    self.__topic_trie.insert(name, observer_collection)
+                # the new collection may match the cached topics.
+                self.__topic_cache = {}
 
-            observer_collection.add_observer(fn, receiver, options=options)
-            self.__notifications_dict[name] = observer_collection
+            observer_collection.add_observer(fn, receiver, options=options, weak=weak)
 
     def remove_observer(self, name: str, fn: Callable[..., Any], receiver: Any = None):
-        observer_collection = self.__get_notification_observer_collection__(name)
-        if observer_collection is not None:
+        with self.__lock:
+            observer_collection = self.__get_notification_observer_collection__(name)
             observer_collection.remove_observer(fn, receiver)
+            self.__drop_empty_topic_patterns__([name])
 
     def remove_observers(self, receiver: Any):
         with self.__lock:
             for _, observer_collection in self.__notifications_dict.items():
                 observer_collection.remove_observers(receiver)
+            self.__drop_empty_topic_patterns__(self.__notifications_dict.keys())
+
+    def __drop_empty_topic_patterns__(self, names: Iterable[str]):
+        # call with lock held. once the last pattern is gone, notify takes the lock free exact path again.
+        empty_patterns = [
+            name for name in names if is_topic_pattern(name) and self.__notifications_dict[name].is_empty
+        ]
+        if len(empty_patterns) == 0:
+            return
+        # copy on write, notify_observers reads the dict without lock.
+        notifications_dict = dict(self.__notifications_dict)
+        for name in empty_patterns:
+            del notifications_dict[name]
+            self.__topic_trie.remove(name)
+        self.__notifications_dict = notifications_dict
+        self.__topic_cache = {}
 
     def remove_all_observers(self):
         with self.__lock:
             for _, observer_collection in self.__notifications_dict.items():
                 observer_collection.remove_all_observers()
-            self.__notifications_dict.clear()
+            self.__notifications_dict = {}
+            self.__topic_trie = PyNotiTopicTrie()
+            self.__topic_cache = {}
 
     def notify_observers(self, name: str, *args: Any, **kwargs: Any):
-        observer_collection = self.__get_notification_observer_collection__(name)
-        if observer_collection is not None:
+        if len(self.__topic_trie) == 0:
+            # no wildcard pattern, the name is matched exactly.
+            observer_collection = self.__get_notification_observer_collection__(name)
             observer_collection.notify_observers(*args, **kwargs)
+            return
 
-    def __get_notification_observer_collection__(self, name: str) -> PyNotiObserverCollection:
+        observer_collections = self.__topic_cache.get(name)
+        if observer_collections is None:
+            observer_collections = self.__match_topic__(name)
+        if len(observer_collections) == 0:
+            raise ValueError(f"observer collection name not exist. {name}")
+        # a full task queue should not stop the other observer collections from being notified.
+        error: Optional[PyNotiQueueFullError] = None
+        for observer_collection in observer_collections:
+            try:
+                observer_collection.notify_observers(*args, **kwargs)
+            except PyNotiQueueFullError as e:
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
+
+    def __match_topic__(self, name: str) -> Tuple[PyNotiObserverCollection, ...]:
         with self.__lock:
-            if name not in self.__notifications_dict:
-                raise ValueError(f"observer collection name not exist. {name}")
-            return self.__notifications_dict[name]
+            observer_collections: List[PyNotiObserverCollection] = []
+            observer_collection = self.__notifications_dict.get(name)
+            if observer_collection is not None:
+                observer_collections.append(observer_collection)
+            for pattern_collection in self.__topic_trie.match(name):
+                if pattern_collection is not observer_collection:
+                    observer_collections.append(pattern_collection)
+            matched = tuple(observer_collections)
+            if len(self.__topic_cache) >= PYNOTI_TOPIC_CACHE_SIZE:
+                self.__topic_cache = {}
+            self.__topic_cache[name] = matched
+            return matched
 
-    def __notification_scheduler__(self, observer: PyNotiObserver, *args: Any, **kwargs: Any):
-        if observer.options is None:
-            self.post_task(observer.fn, *args, **kwargs)
+    def __get_notification_observer_collection__(self, name: str) -> PyNotiObserverCollection:
+        # lock free, the dict is never mutated after it is published.
+        observer_collection = self.__notifications_dict.get(name)
+        if observer_collection is None:
+            raise ValueError(f"observer collection name not exist. {name}")
+        return observer_collection
+
+    def __notification_scheduler__(self, group: PyNotiObserverGroup, *args: Any, **kwargs: Any):
+        # switch to target task queue. lock free lookup, fall back to create the queue under lock.
+        q = self.__task_queue_dict.get(group.queue)
+        if q is None:
+            # the observer options configure the queue, the first one creating it wins like create_task_queue.
+            q = self.__get_or_create_task_queue__(group.queue, group.options)
+        if not group.is_coalesced:
+            q.post_resolved_fanout_task(group.fns, group.is_async, args, kwargs)
             return
-        # switch to target task queue
-        self.post_task_to_task_queue(observer.options.queue, observer.fn, *args, **kwargs)
+        options = group.options
+        q.post_coalesced_fanout_task(
+            group.key,
+            group.fns,
+            args,
+            kwargs,
+            reducer=options.reducer,
+            debounce=options.debounce,
+            throttle=options.throttle,
+            is_async=group.is_async,
+        )
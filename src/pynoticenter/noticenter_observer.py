@@ -1,82 +1,261 @@
 """PyNotiObserver"""
+import asyncio
+import inspect
+import logging
 import threading
-from typing import Any, Callable, Dict, List, Optional
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from pynoticenter.options import PyNotiOptions
+from pynoticenter.task_queue import PyNotiQueueFullError
+
+
+def weak_method_fn(
+    fn: Callable[..., Any], callback: Optional[Callable[..., Any]]
+) -> Tuple[weakref.WeakMethod, Callable[..., Any]]:
+    """weak reference to the bound method fn. return the reference and a function calling the method if alive."""
+    ref = weakref.WeakMethod(fn, callback)
+    if asyncio.iscoroutinefunction(fn):
+
+        async def call_async(*args: Any, **kwargs: Any) -> Any:
+            method = ref()
+            if method is None:
+                return None
+            return await method(*args, **kwargs)
+
+        call: Callable[..., Any] = call_async
+    else:
+
+        def call_sync(*args: Any, **kwargs: Any) -> Any:
+            method = ref()
+            if method is None:
+                return None
+            return method(*args, **kwargs)
+
+        call = call_sync
+    # no functools.wraps, __wrapped__ would keep the method alive.
+    call.__name__ = fn.__name__
+    call.__qualname__ = fn.__qualname__
+    return ref, call
 
 
 class PyNotiObserver(object):
-    def __init__(self, fn: Callable[..., Any], options: Optional[PyNotiOptions]):
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        options: Optional[PyNotiOptions],
+        *,
+        weak: bool = False,
+        on_dead: Optional[Callable[..., Any]] = None,
+    ):
+        self.__fn_ref: Optional[weakref.WeakMethod] = None
         self.__fn: Callable[..., Any] = fn
-        self.__options: Optional[PyNotiOptions] = options
+        if weak and inspect.ismethod(fn):
+            self.__fn_ref, self.__fn = weak_method_fn(fn, on_dead)
+        self.__is_async: bool = asyncio.iscoroutinefunction(self.__fn)
+        # resolve the options once, observers are read without lock on notify.
+        self.__options: PyNotiOptions = options if options is not None else PyNotiOptions(queue=f"{id(self)}")
 
     @property
     def fn(self) -> Callable[..., Any]:
         return self.__fn
 
+    @property
+    def is_async(self) -> bool:
+        return self.__is_async
+
     @property
     def options(self) -> PyNotiOptions:
-        if self.__options is None:
-            self.__options = PyNotiOptions(queue=f"{id(self)}")
         return self.__options
 
+    @property
+    def is_alive(self) -> bool:
+        return self.__fn_ref is None or self.__fn_ref() is not None
+
+    def is_fn(self, fn: Callable[..., Any]) -> bool:
+        if self.__fn_ref is not None:
+            return self.__fn_ref() == fn
+        return self.__fn == fn
+
+
+class PyNotiObserverGroup:
+    """PyNotiObserverGroup, the observers which share the target task queue and the delivery options."""
+
+    __slots__ = ("key", "fns", "is_async", "options")
+
+    def __init__(self, key: Tuple[Any, ...], observers: List[PyNotiObserver], options: PyNotiOptions):
+        self.key: Tuple[Any, ...] = key
+        self.fns: Tuple[Callable[..., Any], ...] = tuple(observer.fn for observer in observers)
+        # resolved once per group, the task queue caches the invokers of fns by this tuple.
+        self.is_async: Tuple[bool, ...] = tuple(observer.is_async for observer in observers)
+        self.options: PyNotiOptions = options
+
+    @property
+    def queue(self) -> str:
+        return self.options.queue
+
+    @property
+    def is_coalesced(self) -> bool:
+        options = self.options
+        return options.coalesce or options.reducer is not None or options.debounce > 0 or options.throttle > 0
+
 
 class PyNotiObserverCollection:
     def __init__(self, name: str, scheduler: Callable[..., Any]):
         self.__name: str = name
         self.__scheduler = scheduler
-        self.__lock: threading.RLock = threading.RLock()
+        # not reentrant, a garbage collection callback must not purge in the middle of a mutation.
+        self.__lock: threading.Lock = threading.Lock()
         self.__fn_list: List[PyNotiObserver] = []
         self.__receiver_observers_dict: Dict[Any, List[PyNotiObserver]] = {}
+        self.__weak_receiver_observers_dict: Dict[weakref.ref, List[PyNotiObserver]] = {}
+        self.__is_purge_pending: bool = False
+        # immutable dispatch snapshot, republished by every mutation. notify reads it without lock.
+        # observers are grouped by target task queue and delivery options, in registration order.
+        self.__dispatch_groups: Tuple[PyNotiObserverGroup, ...] = ()
+
+    @property
+    def is_empty(self) -> bool:
+        with self.__lock:
+            return (
+                len(self.__fn_list) == 0
+                and len(self.__receiver_observers_dict) == 0
+                and len(self.__weak_receiver_observers_dict) == 0
+            )
 
-    def add_observer(self, fn: Callable[..., Any], receiver: Any = None, *, options: Optional[PyNotiOptions] = None):
+    def add_observer(
+        self,
+        fn: Callable[..., Any],
+        receiver: Any = None,
+        *,
+        options: Optional[PyNotiOptions] = None,
+        weak: bool = False,
+    ):
         if fn is None:
             return
 
+        observer = PyNotiObserver(fn, options, weak=weak, on_dead=self.__on_dead__)
         with self.__lock:
             if receiver is None:
-                self.__fn_list.append(PyNotiObserver(fn, options))
-                return
-
-            if receiver in self.__receiver_observers_dict:
-                self.__receiver_observers_dict[receiver].append(PyNotiObserver(fn, options))
+                self.__fn_list.append(observer)
+            elif weak:
+                key = weakref.ref(receiver, self.__on_dead__)
+                if key in self.__weak_receiver_observers_dict:
+                    self.__weak_receiver_observers_dict[key].append(observer)
+                else:
+                    self.__weak_receiver_observers_dict[key] = list([observer])
+            elif receiver in self.__receiver_observers_dict:
+                self.__receiver_observers_dict[receiver].append(observer)
             else:
-                self.__receiver_observers_dict[receiver] = list([PyNotiObserver(fn, options)])
+                self.__receiver_observers_dict[receiver] = list([observer])
+            self.__publish_observers__()
 
     def remove_observer(self, fn: Callable[..., Any], receiver: Any = None):
-        def remove_fn(item: PyNotiObserver) -> bool:
-            return item.fn == fn
+        def keep_fn(item: PyNotiObserver) -> bool:
+            return not item.is_fn(fn)
 
         with self.__lock:
             if receiver is None:
-                self.__fn_list = list(filter(remove_fn, self.__fn_list))
-                return
-
-            if receiver not in self.__receiver_observers_dict:
+                self.__fn_list = list(filter(keep_fn, self.__fn_list))
+                self.__publish_observers__()
                 return
 
-            observers = self.__receiver_observers_dict.pop(receiver)
-            observers = list(filter(remove_fn, observers))
-            if len(observers) > 0:
-                self.__receiver_observers_dict[receiver] = observers
+            for observers_dict, key in self.__receiver_keys__(receiver):
+                observers = observers_dict.pop(key)
+                observers = list(filter(keep_fn, observers))
+                if len(observers) > 0:
+                    observers_dict[key] = observers
+            self.__publish_observers__()
 
     def remove_observers(self, receiver: Any):
         if receiver is None:
             return
         with self.__lock:
-            if receiver in self.__receiver_observers_dict:
-                self.__receiver_observers_dict.pop(receiver)
+            for observers_dict, key in self.__receiver_keys__(receiver):
+                observers_dict.pop(key)
+            self.__publish_observers__()
 
     def remove_all_observers(self):
         with self.__lock:
             self.__fn_list.clear()
             self.__receiver_observers_dict.clear()
+            self.__weak_receiver_observers_dict.clear()
+            self.__publish_observers__()
 
-    def notify_observers(self, *args: Any, **kwargs: Any):
-        observers = list[PyNotiObserver]()
-        with self.__lock:
-            observers.extend(self.__fn_list)
-            for _, v in self.__receiver_observers_dict.items():
-                observers.extend(v)
+    def __receiver_keys__(self, receiver: Any) -> List[Tuple[Dict[Any, List[PyNotiObserver]], Any]]:
+        # call with lock held.
+        keys: List[Tuple[Dict[Any, List[PyNotiObserver]], Any]] = []
+        if receiver in self.__receiver_observers_dict:
+            keys.append((self.__receiver_observers_dict, receiver))
+        if len(self.__weak_receiver_observers_dict) > 0:
+            try:
+                key = weakref.ref(receiver)
+            except TypeError:
+                return keys
+            if key in self.__weak_receiver_observers_dict:
+                keys.append((self.__weak_receiver_observers_dict, key))
+        return keys
+
+    def __on_dead__(self, _: weakref.ref):
+        # call from garbage collection, on any thread, maybe while this thread holds the lock.
+        self.__is_purge_pending = True
+        if not self.__lock.acquire(blocking=False):
+            # the lock holder or the next notify purges.
+            return
+        try:
+            self.__publish_observers__()
+        finally:
+            self.__lock.release()
+
+    def __purge_dead_observers__(self):
+        # call with lock held.
+        self.__is_purge_pending = False
+        self.__fn_list = [observer for observer in self.__fn_list if observer.is_alive]
+        for observers_dict in (self.__receiver_observers_dict, self.__weak_receiver_observers_dict):
+            for key in list(observers_dict.keys()):
+                if isinstance(key, weakref.ref) and key() is None:
+                    del observers_dict[key]
+                    continue
+                observers = [observer for observer in observers_dict[key] if observer.is_alive]
+                if len(observers) > 0:
+                    observers_dict[key] = observers
+                else:
+                    del observers_dict[key]
+
+    def __publish_observers__(self):
+        # call with lock held.
+        if self.__is_purge_pending:
+            self.__purge_dead_observers__()
+        observers: List[PyNotiObserver] = []
+        observers.extend(self.__fn_list)
+        for _, v in self.__receiver_observers_dict.items():
+            observers.extend(v)
+        for _, v in self.__weak_receiver_observers_dict.items():
+            observers.extend(v)
+        groups: Dict[Tuple[Any, ...], List[PyNotiObserver]] = {}
         for observer in observers:
-            self.__scheduler(observer, *args, **kwargs)
+            options = observer.options
+            key = (self.__name, options.queue, options.coalesce, options.reducer, options.debounce, options.throttle)
+            groups.setdefault(key, []).append(observer)
+        self.__dispatch_groups = tuple(
+            PyNotiObserverGroup(key, group, group[0].options)
+            for key, group in groups.items()
+        )
+
+    def notify_observers(self, *args: Any, **kwargs: Any):
+        if self.__is_purge_pending:
+            with self.__lock:
+                if self.__is_purge_pending:
+                    self.__publish_observers__()
+        # one task per target task queue.
+        # a full task queue should not stop the other task queues from being notified.
+        error: Optional[PyNotiQueueFullError] = None
+        for group in self.__dispatch_groups:
+            try:
+                self.__scheduler(group, *args, **kwargs)
+            except PyNotiQueueFullError as e:
+                logging.warning(f"Notification[{self.__name}]: {e}")
+                if error is None:
+                    error = e
+        if error is not None:
+            raise error
@@ -1,7 +1,43 @@
+from concurrent.futures import Executor
 from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+
+class PyNotiOverflowPolicy(str, Enum):
+    """What a bounded task queue does with a new task when it already holds max_pending tasks."""
+
+    BLOCK = "block"
+    """block the producer until there is room, raise PyNotiQueueFullError when overflow_timeout expires."""
+    REJECT = "reject"
+    """raise PyNotiQueueFullError."""
+    DROP_NEWEST = "drop_newest"
+    """drop the new task."""
+    DROP_OLDEST = "drop_oldest"
+    """cancel the oldest task which is not executing, then add the new task."""
+    COALESCE = "coalesce"
+    """replace the args of the latest waiting task with the same fn, drop the new task if there is none."""
 
 
 @dataclass(frozen=True)
 class PyNotiOptions:
     queue: str
     fn_with_task_id: bool = False
+    max_batch: int = 0
+    max_pending: int = 0
+    overflow_policy: PyNotiOverflowPolicy = PyNotiOverflowPolicy.BLOCK
+    overflow_timeout: Optional[float] = None
+    # None means 1, serial, and the worker count for executor="process".
+    max_concurrency: Optional[int] = None
+    executor: Union[str, Executor, None] = None
+    workers: Optional[int] = None
+    idle_timeout: float = 0
+    # observer only, how the notifications are delivered to the observers.
+    # coalesce: merge a notification into the one still waiting in the task queue, the latest args win.
+    # reducer: reducer((args, kwargs), (args, kwargs)) -> (args, kwargs) merges the waiting and the new notification.
+    # debounce: deliver once the notifications stop for debounce seconds.
+    # throttle: deliver at most once every throttle seconds.
+    coalesce: bool = False
+    reducer: Optional[Callable[..., Tuple[Tuple[Any, ...], Dict[str, Any]]]] = None
+    debounce: float = 0
+    throttle: float = 0
@@ -0,0 +1,74 @@
+import heapq
+from collections import deque
+from typing import Deque, Dict, List
+
+from pynoticenter.task import PyNotiTask
+
+
+class PyNotiPendingQueue:
+    """PyNotiPendingQueue, ready tasks waiting for execution. Not thread safety, guard by the task queue lock.
+
+    Tasks are grouped by priority, the higher priority is taken first. Tasks with the same priority keep FIFO order.
+    """
+
+    def __init__(self):
+        self.__levels: Dict[int, Deque[PyNotiTask]] = {}
+        # max heap of the priorities which have tasks, store as negative value.
+        self.__priorities: List[int] = []
+        self.__count: int = 0
+        # the highest priority which has tasks, -inf when empty. a plain attribute, the worker compares it per task.
+        self.top_priority: float = float("-inf")
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def append(self, task: PyNotiTask, priority: int = 0):
+        level = self.__levels.get(priority)
+        if level is None:
+            level = deque()
+            self.__levels[priority] = level
+            heapq.heappush(self.__priorities, -priority)
+            if priority > self.top_priority:
+                self.top_priority = priority
+        level.append(task)
+        self.__count += 1
+
+    def pop_batch(self, max_batch: int = 0) -> Deque[PyNotiTask]:
+        """pop tasks of the highest priority, at most max_batch tasks. 0 means all tasks of that priority."""
+        if self.__count == 0:
+            return deque()
+        priority = -self.__priorities[0]
+        level = self.__levels[priority]
+        if max_batch <= 0 or len(level) <= max_batch:
+            heapq.heappop(self.__priorities)
+            del self.__levels[priority]
+            self.__count -= len(level)
+            self.top_priority = -self.__priorities[0] if len(self.__priorities) > 0 else float("-inf")
+            return level
+        batch: Deque[PyNotiTask] = deque()
+        for _ in range(max_batch):
+            batch.append(level.popleft())
+        self.__count -= max_batch
+        return batch
+
+    def has_higher_priority(self, priority: int) -> bool:
+        """whether there are tasks with higher priority than priority."""
+        return self.top_priority > priority
+
+    def push_front(self, tasks: Deque[PyNotiTask], priority: int):
+        """give back the tasks taken by pop_batch and not executed, ahead of the tasks of the same priority."""
+        if len(tasks) == 0:
+            return
+        level = self.__levels.get(priority)
+        if level is None:
+            self.__levels[priority] = tasks
+            heapq.heappush(self.__priorities, -priority)
+            if priority > self.top_priority:
+                self.top_priority = priority
+        else:
+            level.extendleft(reversed(tasks))
+        self.__count += len(tasks)
+
+    def depth(self) -> Dict[int, int]:
+        """return pending task count of each priority."""
+        return {priority: len(level) for priority, level in self.__levels.items()}
@@ -0,0 +1,107 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple, cast
+
+PYNOTI_SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+
+class PyNotiSharedBuffer:
+    """PyNotiSharedBuffer, a bytes-like argument moved into shared memory. Only the reference is pickled."""
+
+    __slots__ = ("name", "size", "is_bytearray")
+
+    def __init__(self, name: str, size: int, is_bytearray: bool):
+        self.name: str = name
+        self.size: int = size
+        self.is_bytearray: bool = is_bytearray
+
+    def load(self) -> Any:
+        # call from child process.
+        # the worker process shares the resource tracker of the parent process, which owns and unlinks the segment.
+        shm = SharedMemory(name=self.name)
+        try:
+            data = cast(memoryview, shm.buf)[: self.size]
+            value = bytearray(data) if self.is_bytearray else bytes(data)
+            data.release()
+        finally:
+            shm.close()
+        return value
+
+
+def __process_call__(fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+    # call from child process.
+    args = tuple(arg.load() if isinstance(arg, PyNotiSharedBuffer) else arg for arg in args)
+    kwargs = {k: v.load() if isinstance(v, PyNotiSharedBuffer) else v for k, v in kwargs.items()}
+    result = fn(*args, **kwargs)
+    if asyncio.iscoroutine(result):
+        result = asyncio.run(result)
+    return result
+
+
+class PyNotiProcessExecutor(Executor):
+    """PyNotiProcessExecutor, process pool for CPU-bound tasks.
+
+    fn and args must be picklable. bytes, bytearray and memoryview arguments not smaller than
+    shared_memory_threshold are passed through shared memory instead of the pipe to the worker process.
+    """
+
+    def __init__(self, workers: Optional[int] = None, shared_memory_threshold: int = PYNOTI_SHARED_MEMORY_THRESHOLD):
+        self.__workers: int = workers if workers is not None and workers > 0 else (os.cpu_count() or 1)
+        self.__shared_memory_threshold: int = shared_memory_threshold
+        # spawn, fork a multithreaded process is not safe.
+        self.__pool: ProcessPoolExecutor = ProcessPoolExecutor(
+            max_workers=self.__workers, mp_context=get_context("spawn")
+        )
+
+    @property
+    def workers(self) -> int:
+        return self.__workers
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        if isinstance(fn, functools.partial) and len(args) == 0 and len(kwargs) == 0:
+            # run_in_executor binds the arguments with functools.partial.
+            args, kwargs = fn.args, dict(fn.keywords)
+            fn = fn.func
+
+        segments: List[SharedMemory] = []
+        try:
+            args = tuple(self.__share__(arg, segments) for arg in args)
+            kwargs = {k: self.__share__(v, segments) for k, v in kwargs.items()}
+            future = self.__pool.submit(__process_call__, fn, args, kwargs)
+        except BaseException:
+            self.__release_segments__(segments)
+            raise
+        if len(segments) > 0:
+            future.add_done_callback(lambda _: self.__release_segments__(segments))
+        return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self.__pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __share__(self, value: Any, segments: List[SharedMemory]) -> Any:
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            return value
+        data = memoryview(value)
+        if data.nbytes < self.__shared_memory_threshold or not data.c_contiguous:
+            data.release()
+            return value
+        size = data.nbytes
+        shm = SharedMemory(create=True, size=size)
+        segments.append(shm)
+        cast(memoryview, shm.buf)[:size] = data.cast("B")
+        data.release()
+        return PyNotiSharedBuffer(shm.name, size, isinstance(value, bytearray))
+
+    def __release_segments__(self, segments: List[SharedMemory]):
+        for shm in segments:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception as e:
+                logging.error(e)
+        segments.clear()
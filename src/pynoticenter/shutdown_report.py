@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass(frozen=True)
+class PyNotiDroppedTask:
+    """a task which did not complete before the task queue was terminated."""
+
+    queue: str
+    task_id: str
+    fn: str
+    # the task was executing at the deadline, it was abandoned instead of cancelled.
+    is_running: bool = False
+
+
+@dataclass(frozen=True)
+class PyNotiShutdownReport:
+    """returned by PyNotiCenter.shutdown."""
+
+    # all the tasks completed and all the threads exited before the deadline.
+    completed: bool
+    elapsed: float
+    dropped_tasks: List[PyNotiDroppedTask] = field(default_factory=list)
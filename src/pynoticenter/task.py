@@ -1,37 +1,213 @@
 import asyncio
+import contextvars
+import functools
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Sequence, Tuple, Union, cast
+
+from pynoticenter.task_handle import PyNotiTaskHandle
+from pynoticenter.timer_wheel import PyNotiTimerHandle
+
+# most tasks have no kwargs, they share one read only mapping instead of an empty dict each.
+PYNOTI_NO_KWARGS: Mapping[str, Any] = MappingProxyType({})
+
+# invoker(fn, task_id, args, kwargs, sync_executor), call fn of the task in the call shape resolved beforehand.
+PyNotiInvoker = Callable[
+    [Callable[..., Any], int, Tuple[Any, ...], Mapping[str, Any], Optional[Executor]], Awaitable[Any]
+]
+
+# fn of a task, a tuple of fns for a fan-out task. the aliases are built once, cast on the hot path is free.
+PyNotiFn = Callable[..., Any]
+PyNotiFanoutFns = Tuple[PyNotiFn, ...]
+PyNotiTaskFn = Union[PyNotiFn, PyNotiFanoutFns, None]
+
+# max cached fan-out invokers of a task queue config.
+PYNOTI_FANOUT_CACHE_SIZE = 256
+
+
+def fanout_is_async(fns: Sequence[Callable[..., Any]]) -> Tuple[bool, ...]:
+    """whether each fn of a fan-out task is a coroutine function."""
+    return tuple(asyncio.iscoroutinefunction(fn) for fn in fns)
+
+
+async def invoke_sync_fn(
+    fn: Callable[..., Any],
+    task_id: int,
+    args: Tuple[Any, ...],
+    kwargs: Mapping[str, Any],
+    sync_executor: Optional[Executor],
+) -> Any:
+    if sync_executor is None:
+        return fn(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    if isinstance(sync_executor, ThreadPoolExecutor):
+        # carry the context vars to the pool thread, the same as asyncio.to_thread.
+        call = functools.partial(contextvars.copy_context().run, call)
+    return await loop.run_in_executor(sync_executor, call)
+
+
+async def invoke_async_fn(
+    fn: Callable[..., Any],
+    task_id: int,
+    args: Tuple[Any, ...],
+    kwargs: Mapping[str, Any],
+    sync_executor: Optional[Executor],
+) -> Any:
+    return await fn(*args, **kwargs)
+
+
+def with_preprocessors(invoker: PyNotiInvoker, preprocessors: Sequence[Callable[..., Any]]) -> PyNotiInvoker:
+    """middleware, call the preprocessors in order before fn. fn is skipped once a preprocessor returns True."""
+    chain = tuple((preprocessor, asyncio.iscoroutinefunction(preprocessor)) for preprocessor in preprocessors)
+
+    async def invoke(
+        fn: Callable[..., Any],
+        task_id: int,
+        args: Tuple[Any, ...],
+        kwargs: Mapping[str, Any],
+        sync_executor: Optional[Executor],
+    ) -> Any:
+        for preprocessor, is_async in chain:
+            handled = preprocessor(fn, *args, **kwargs)
+            if is_async:
+                handled = await handled
+            if handled:
+                return None
+        return await invoker(fn, task_id, args, kwargs, sync_executor)
+
+    return invoke
+
+
+def with_task_id(invoker: PyNotiInvoker) -> PyNotiInvoker:
+    """middleware, pass the task id as the first arg, str as the task id returned by the task queue."""
+
+    async def invoke(
+        fn: Callable[..., Any],
+        task_id: int,
+        args: Tuple[Any, ...],
+        kwargs: Mapping[str, Any],
+        sync_executor: Optional[Executor],
+    ) -> Any:
+        return await invoker(fn, task_id, (str(task_id), *args), kwargs, sync_executor)
+
+    return invoke
+
+
+class PyNotiTaskConfig:
+    """PyNotiTaskConfig, the settings of a task queue shared by its tasks.
+
+    Copy on write, the task queue replaces the config when a setting changes, the posted tasks keep the old one.
+    The preprocessors and the task id arg are compiled into the invokers once, when the config is created.
+    """
+
+    __slots__ = ("preprocessors", "fn_with_task_id", "sync_invoker", "async_invoker", "__fanout_cache")
+
+    def __init__(self, preprocessors: Tuple[Callable[..., Any], ...] = (), fn_with_task_id: bool = False):
+        self.preprocessors: Tuple[Callable[..., Any], ...] = preprocessors
+        self.fn_with_task_id: bool = fn_with_task_id
+        self.sync_invoker: PyNotiInvoker = self.__compile__(invoke_sync_fn)
+        self.async_invoker: PyNotiInvoker = self.__compile__(invoke_async_fn)
+        # id(is_async) -> (is_async, invokers). the entry keeps is_async alive, so its id is not reused.
+        self.__fanout_cache: Dict[int, Tuple[Tuple[bool, ...], Tuple[PyNotiInvoker, ...]]] = {}
+
+    def __compile__(self, invoker: PyNotiInvoker) -> PyNotiInvoker:
+        # the preprocessors see the task id too, so it is the outer middleware.
+        if len(self.preprocessors) > 0:
+            invoker = with_preprocessors(invoker, self.preprocessors)
+        if self.fn_with_task_id:
+            invoker = with_task_id(invoker)
+        return invoker
+
+    def invoker(self, fn: Callable[..., Any]) -> PyNotiInvoker:
+        return self.async_invoker if asyncio.iscoroutinefunction(fn) else self.sync_invoker
+
+    def fanout_invokers(self, is_async: Tuple[bool, ...]) -> Tuple[PyNotiInvoker, ...]:
+        """the invokers of the fns of a fan-out task, see fanout_is_async.
+
+        Cached by the is_async tuple object, an observer group resolves it once and posts it with every notification.
+        """
+        entry = self.__fanout_cache.get(id(is_async))
+        if entry is not None and entry[0] is is_async:
+            return entry[1]
+        invokers = tuple(self.async_invoker if fn_is_async else self.sync_invoker for fn_is_async in is_async)
+        if len(self.__fanout_cache) >= PYNOTI_FANOUT_CACHE_SIZE:
+            self.__fanout_cache = {}
+        self.__fanout_cache[id(is_async)] = (is_async, invokers)
+        return invokers
 
 
 class PyNotiTask:
+    __slots__ = (
+        "__task_id",
+        "__delay",
+        "__fn",
+        "__invoker",
+        "__fanout_invokers",
+        "__args",
+        "__kwargs",
+        "__timer_handle",
+        "__handle",
+        "__priority",
+        "__ready_time",
+    )
+
     def __init__(
         self,
-        task_id: str,
+        task_id: int,
         delay: float,
-        fn: Optional[Callable[..., Any]],
-        preprocessor: Optional[Callable[..., Any]],
-        *args: Any,
-        executor: Optional[ThreadPoolExecutor],
-        **kwargs: Any,
+        fn: PyNotiTaskFn,
+        config: PyNotiTaskConfig,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        fanout_invokers: Optional[Tuple[PyNotiInvoker, ...]] = None,
     ):
-        self.__task_id: str = task_id
-        self.__preprocessor: Optional[Callable[..., Any]] = preprocessor
-        self.__delay: float = delay
-        self.__fn: Optional[Callable[..., Any]] = fn
-        self.__args: Any = args
-        self.__kwargs: Dict[str, Any] = kwargs
-        self.__timer_handle: Optional[asyncio.TimerHandle] = None
-        self.__thread_pool: Optional[ThreadPoolExecutor] = executor
-        self.__fn_with_task_id: bool = False
+        """fanout_invokers: fn is a tuple of fns called by these invokers, see PyNotiTaskConfig.fanout_invokers.
 
-    def set_with_task_id(self, with_task_id: bool):
-        self.__fn_with_task_id = with_task_id
+        The fns are called in order with the same args, an error of one does not stop the rest.
+        """
+        self.__task_id: int = task_id
+        self.__delay: float = delay
+        self.__fn: PyNotiTaskFn = fn
+        # resolve the call shape once, not on every execution.
+        self.__invoker: Optional[PyNotiInvoker] = None
+        self.__fanout_invokers: Optional[Tuple[PyNotiInvoker, ...]] = fanout_invokers
+        if fanout_invokers is None and fn is not None:
+            self.__invoker = config.invoker(cast(PyNotiFn, fn))
+        self.__args: Tuple[Any, ...] = args
+        self.__kwargs: Mapping[str, Any] = kwargs if len(kwargs) > 0 else PYNOTI_NO_KWARGS
+        self.__timer_handle: Optional[PyNotiTimerHandle] = None
+        self.__handle: Optional[PyNotiTaskHandle] = None
+        self.__priority: int = 0
+        self.__ready_time: float = 0
 
     @property
-    def task_id(self) -> str:
+    def task_id(self) -> int:
         return self.__task_id
 
+    @property
+    def fn(self) -> PyNotiTaskFn:
+        return self.__fn
+
+    @property
+    def fn_name(self) -> str:
+        """qualified name of fn, for logs and reports."""
+        fns = self.__fn if isinstance(self.__fn, tuple) else (self.__fn,)
+        return ",".join(getattr(fn, "__qualname__", repr(fn)) for fn in fns)
+
+    @property
+    def args(self) -> Tuple[Any, ...]:
+        return self.__args
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        return dict(self.__kwargs)
+
+    def set_args(self, *args: Any, **kwargs: Any):
+        self.__args = args
+        self.__kwargs = kwargs if len(kwargs) > 0 else PYNOTI_NO_KWARGS
+
     @property
     def delay(self) -> float:
         return self.__delay
@@ -39,16 +215,49 @@ class PyNotiTask:
     def set_delay(self, delay: float):
         self.__delay = delay
 
+    @property
+    def ready_time(self) -> float:
+        """time.monotonic() when the task is ready to run, after the delay."""
+        return self.__ready_time
+
+    def set_ready_time(self, ready_time: float):
+        self.__ready_time = ready_time
+
+    @property
+    def priority(self) -> int:
+        return self.__priority
+
+    def set_priority(self, priority: int):
+        self.__priority = priority
+
     @property
     def is_cancelled(self) -> bool:
         if self.__timer_handle is None:
             return False
         return self.__timer_handle.cancelled()
 
-    def set_timer_handle(self, handle: asyncio.TimerHandle):
+    def set_timer_handle(self, handle: PyNotiTimerHandle):
+        self.__timer_handle = handle
+
+    def reset_timer_handle(self, handle: PyNotiTimerHandle):
+        """cancel the delay timer and replace it by handle."""
+        if self.__timer_handle is not None:
+            self.__timer_handle.cancel()
         self.__timer_handle = handle
 
+    @property
+    def handle(self) -> Optional[PyNotiTaskHandle]:
+        return self.__handle
+
+    def set_handle(self, handle: PyNotiTaskHandle):
+        self.__handle = handle
+
+    def cancel_handle(self):
+        if self.__handle is not None:
+            self.__handle.cancel()
+
     def cancel(self):
+        self.cancel_handle()
         if self.__timer_handle is None:
             return
         if self.__timer_handle.cancelled():
@@ -57,36 +266,44 @@ class PyNotiTask:
         logging.debug(f"Task[{self.__task_id}] cancel task.")
         self.__timer_handle.cancel()
 
-    def is_async(self):
-        return asyncio.iscoroutinefunction(self.__fn)
+    async def execute(self, sync_executor: Optional[Executor] = None) -> Optional[Exception]:
+        """execute the task. return the exception raised by fn, the first one of a fan-out task.
 
-    async def execute(self):
-        if self.__fn is None:
-            return
-        logging.debug(f"Task[{self.__task_id}] execute.")
+        sync_executor runs sync fn instead of the event loop thread. None means run on the event loop thread.
+        """
+        handle = self.__handle
+        if handle is not None and not handle.set_running_or_notify_cancel():
+            logging.debug(f"Task[{self.__task_id}] handle has been cancelled.")
+            return None
+        fanout_invokers = self.__fanout_invokers
+        if fanout_invokers is not None:
+            fns = cast(PyNotiFanoutFns, self.__fn)
+            error: Optional[Exception] = None
+            for fn, invoker in zip(fns, fanout_invokers):
+                try:
+                    await invoker(fn, self.__task_id, self.__args, self.__kwargs, sync_executor)
+                except Exception as e:
+                    logging.error(e)
+                    if error is None:
+                        error = e
+            if handle is not None:
+                handle.set_result(None)
+            return error
+
+        single_invoker = self.__invoker
+        if single_invoker is None:
+            # no fn.
+            if handle is not None:
+                handle.set_result(None)
+            return None
         try:
-            handled = False
-            if self.__preprocessor is not None:
-                if asyncio.iscoroutinefunction(self.__preprocessor):
-                    if self.__fn_with_task_id:
-                        handled = await self.__preprocessor(self.__fn, *self.__task_id, *self.__args, **self.__kwargs)
-                    else:
-                        handled = await self.__preprocessor(self.__fn, *self.__args, **self.__kwargs)
-                else:
-                    if self.__fn_with_task_id:
-                        handled = self.__preprocessor(self.__fn, *self.__task_id, *self.__args, **self.__kwargs)
-                    else:
-                        handled = self.__preprocessor(self.__fn, *self.__args, **self.__kwargs)
-            if not handled:
-                if asyncio.iscoroutinefunction(self.__fn):
-                    if self.__fn_with_task_id:
-                        await self.__fn(self.__task_id, *self.__args, **self.__kwargs)
-                    else:
-                        await self.__fn(*self.__args, **self.__kwargs)
-                else:
-                    if self.__fn_with_task_id:
-                        self.__fn(self.__task_id, *self.__args, **self.__kwargs)
-                    else:
-                        self.__fn(*self.__args, **self.__kwargs)
+            single_fn = cast(PyNotiFn, self.__fn)
+            result = await single_invoker(single_fn, self.__task_id, self.__args, self.__kwargs, sync_executor)
         except Exception as e:
             logging.error(e)
+            if handle is not None:
+                handle.set_exception(e)
+            return e
+        if handle is not None:
+            handle.set_result(result)
+        return None
@@ -0,0 +1,32 @@
+import asyncio
+from concurrent.futures import Future
+from typing import Any, Callable, Generator, Optional
+
+
+class PyNotiTaskHandle(Future):
+    """PyNotiTaskHandle, the result of a submitted task.
+
+    It is a concurrent.futures.Future, so result/exception/add_done_callback work from any thread,
+    and it can be awaited in any asyncio event loop. Cancel the handle will cancel the task in its task queue.
+    """
+
+    def __init__(self, task_id: str, canceller: Optional[Callable[[str], None]] = None):
+        super().__init__()
+        self.__task_id: str = task_id
+        self.__canceller: Optional[Callable[[str], None]] = canceller
+
+    @property
+    def task_id(self) -> str:
+        return self.__task_id
+
+    def cancel(self) -> bool:
+        if self.cancelled():
+            return True
+        if not super().cancel():
+            return False
+        if self.__canceller is not None:
+            self.__canceller(self.__task_id)
+        return True
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return asyncio.wrap_future(self).__await__()
@@ -1,119 +1,660 @@
 import asyncio
+import contextvars
 import logging
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
 from pynoticenter import utils
-from pynoticenter.task import PyNotiTask
-
-PYNOTI_INTERVAL = 0.5
+from pynoticenter.metrics import PyNotiQueueMetrics, PyNotiQueueMetricsSnapshot
+from pynoticenter.options import PyNotiOverflowPolicy
+from pynoticenter.pending_queue import PyNotiPendingQueue
+from pynoticenter.process_executor import PyNotiProcessExecutor
+from pynoticenter.shutdown_report import PyNotiDroppedTask
+from pynoticenter.task import PyNotiTask, PyNotiTaskConfig, PyNotiTaskFn, fanout_is_async
+from pynoticenter.task_handle import PyNotiTaskHandle
+from pynoticenter.timer_wheel import PyNotiTimerWheel
+from pynoticenter.trace_recorder import (
+    PYNOTI_TRACE_FINISH,
+    PYNOTI_TRACE_POST,
+    PYNOTI_TRACE_SCHEDULE,
+    PYNOTI_TRACE_START,
+    PyNotiTraceRecorder,
+)
+from pynoticenter.tracing import PyNotiSlowTaskWatchdog, PyNotiTaskTrace, PyNotiTraceHooks
+from pynoticenter.worker_pool import PyNotiWorkerPool
+
+PYNOTI_EXECUTOR_LOOP = "loop"
+PYNOTI_EXECUTOR_THREAD = "thread"
+PYNOTI_EXECUTOR_PROCESS = "process"
+
+# the task queue whose task is running in this context, also seen by a sync task on a thread pool executor.
+PYNOTI_RUNNING_TASK_QUEUE: contextvars.ContextVar[Optional["PyNotiTaskQueue"]] = contextvars.ContextVar(
+    "pynoti_running_task_queue", default=None
+)
+
+
+class PyNotiQueueFullError(RuntimeError):
+    """raise when a bounded task queue is full and its overflow policy can not take the new task."""
+
+    pass
 
 
 class PyNotiTaskQueue:
-    """PyNotiTaskQueue, each task queue has its own thread. All function thread safety"""
+    """PyNotiTaskQueue, each task queue has its own thread. All function thread safety
+
+    With a worker pool, the task queue has no thread of its own, it runs on one event loop of the pool.
+    """
 
     def __init__(
-        self, name: Optional[str], scheduler_runloop: asyncio.AbstractEventLoop, thread_pool: ThreadPoolExecutor
+        self,
+        name: Optional[str],
+        scheduler_runloop: asyncio.AbstractEventLoop,
+        thread_pool: ThreadPoolExecutor,
+        timer_wheel: Optional[PyNotiTimerWheel] = None,
+        worker_pool: Optional[PyNotiWorkerPool] = None,
+        busy_listener: Optional[Callable[[bool], None]] = None,
     ) -> None:
-        self.__name: Optional[str] = name if name is not None else f"{id(self)}"
+        self.__name: str = name if name is not None else f"{id(self)}"
         self.__lock: threading.RLock = threading.RLock()
         self.__tasks_counter_signal: threading.Event = threading.Event()
-        self.__pending_tasks: List[PyNotiTask] = []
-        self.__preprocessor: Optional[Callable[..., Any]] = None
+        # called with the lock held, when the queue turns from empty to busy, and back.
+        self.__busy_listener: Optional[Callable[[bool], None]] = busy_listener
+        self.__is_busy: bool = False
+        self.__pending_tasks: PyNotiPendingQueue = PyNotiPendingQueue()
+        # shared by the tasks, copy on write.
+        self.__task_config: PyNotiTaskConfig = PyNotiTaskConfig()
         self.__thread_pool: ThreadPoolExecutor = thread_pool
         self.__scheduler_runloop: asyncio.AbstractEventLoop = scheduler_runloop
-        self.__execute_runloop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
+        self.__timer_wheel: PyNotiTimerWheel = (
+            timer_wheel if timer_wheel is not None else PyNotiTimerWheel(scheduler_runloop)
+        )
+        self.__worker_pool: Optional[PyNotiWorkerPool] = worker_pool
+        self.__execute_runloop: asyncio.AbstractEventLoop = (
+            worker_pool.acquire_runloop() if worker_pool is not None else asyncio.new_event_loop()
+        )
         self.__execute_thread_event: threading.Event = threading.Event()
-        self.__execute_task_thread: threading.Thread = threading.Thread(target=self.__worker_thread__)
+        self.__execute_task_thread: threading.Thread = threading.Thread(
+            target=self.__worker_thread__, args=(self.__execute_runloop,)
+        )
+        self.__idle_timeout: float = 0
+        self.__idle_timer_armed: bool = False
+        self.__last_active_time: float = 0
 
         self.__is_terminated: bool = False
         self.__wait_until_task_done: bool = True
+        self.__is_cleanup_scheduled: bool = False
+        self.__metrics: PyNotiQueueMetrics = PyNotiQueueMetrics()
+        # the hooks of the task queue, then the global hooks. copy on write, read by worker thread without lock.
+        self.__queue_trace_hooks: Tuple[PyNotiTraceHooks, ...] = ()
+        self.__global_trace_hooks: Tuple[PyNotiTraceHooks, ...] = ()
+        self.__trace_hooks: Tuple[PyNotiTraceHooks, ...] = ()
+        self.__watchdog: Optional[PyNotiSlowTaskWatchdog] = None
+        self.__recorder: Optional[PyNotiTraceRecorder] = None
         self.__is_started: bool = False
         self.__task_id_count: int = 0
-        self.__task_dict: Dict[str, PyNotiTask] = {}
+        self.__task_dict: Dict[int, PyNotiTask] = {}
         self.__is_executing: bool = False
-        self.__fn_with_task_id: bool = False
+        self.__max_batch: int = 0
+        self.__max_pending: int = 0
+        self.__overflow_policy: PyNotiOverflowPolicy = PyNotiOverflowPolicy.BLOCK
+        self.__overflow_timeout: Optional[float] = None
+        self.__capacity_condition: threading.Condition = threading.Condition(self.__lock)
+        self.__executing_task_ids: Set[int] = set()
+        # resolved from the option with the executor, when the task queue first starts.
+        self.__max_concurrency: int = 1
+        self.__max_concurrency_option: Optional[int] = None
+        self.__concurrency_semaphore: Optional[asyncio.Semaphore] = None
+        self.__executor_option: Union[str, Executor, None] = None
+        self.__sync_executor: Optional[Executor] = None
+        self.__owned_executor: Optional[Executor] = None
+        # resolved by the first start, kept when an idle worker thread is retired and started again.
+        self.__is_executor_resolved: bool = False
+        self.__workers: Optional[int] = None
+        self.__coalesce_index: Dict[Hashable, int] = {}
+        self.__coalesce_fanout_tasks: Dict[Hashable, int] = {}
+        self.__throttle_times: Dict[Hashable, float] = {}
+        # bind once, the timers of all the delayed tasks share it.
+        self.__schedule_task_callback: Callable[[int], None] = self.__schedule_task__
 
     def set_fn_with_task_id(self, with_task_id: bool):
-        self.__fn_with_task_id = with_task_id
+        with self.__lock:
+            self.__task_config = PyNotiTaskConfig(self.__task_config.preprocessors, with_task_id)
+
+    def set_max_batch(self, max_batch: int):
+        """set the max number of tasks executed before yielding to the event loop. 0 means unlimited."""
+        with self.__lock:
+            self.__max_batch = max_batch
+
+    def set_max_pending(
+        self,
+        max_pending: int,
+        overflow_policy: PyNotiOverflowPolicy = PyNotiOverflowPolicy.BLOCK,
+        overflow_timeout: Optional[float] = None,
+    ):
+        """bound the task count of the queue. 0 means unlimited.
+
+        When the queue is full, new task is handled by the overflow policy. overflow_timeout is the max time
+        a producer is blocked with PyNotiOverflowPolicy.BLOCK, None means wait forever.
+        """
+        with self.__lock:
+            self.__max_pending = max_pending
+            self.__overflow_policy = overflow_policy
+            self.__overflow_timeout = overflow_timeout
+            self.__coalesce_index.clear()
+            self.__capacity_condition.notify_all()
+
+    def set_max_concurrency(self, max_concurrency: Optional[int]):
+        """set the max number of tasks running at the same time. 1 means serial.
+
+        When it is greater than 1, async tasks run as concurrent coroutines on the queue event loop
+        and sync tasks run on the executor of the queue, see set_executor.
+        Tasks start in order but may finish in any order.
+        None means the default, 1 and the worker count for a "process" queue.
+        """
+        with self.__lock:
+            if self.__is_executor_resolved:
+                raise ValueError("max concurrency can not be changed after the task queue started.")
+            self.__max_concurrency_option = None if max_concurrency is None else max(1, max_concurrency)
+
+    def set_executor(self, executor: Union[str, Executor, None], workers: Optional[int] = None):
+        """set where sync tasks run, async tasks always run on the queue event loop.
+
+        "loop" runs sync tasks on the queue event loop thread. "thread" runs them on a thread pool of the queue,
+        so a blocking task does not stall the async tasks. "process" runs them on a pool of worker processes,
+        for CPU-bound tasks, fn and args must be picklable, workers default to the cpu count. An Executor runs
+        them on that executor, which is owned by the caller.
+        None means "loop" for serial queue and "thread" when max_concurrency > 1.
+        In all modes, a serial queue waits for a task to complete before the next task starts. A "process" queue
+        with the default max_concurrency runs up to workers tasks at the same time, max_concurrency=1 keeps it serial.
+        """
+        if isinstance(executor, str) and executor not in (
+            PYNOTI_EXECUTOR_LOOP,
+            PYNOTI_EXECUTOR_THREAD,
+            PYNOTI_EXECUTOR_PROCESS,
+        ):
+            raise ValueError(f"unknown executor {executor}.")
+        with self.__lock:
+            if self.__is_executor_resolved:
+                raise ValueError("executor can not be changed after the task queue started.")
+            self.__executor_option = executor
+            self.__workers = workers
+
+    def __resolve_sync_executor__(self):
+        # call with lock held, once before the worker thread first start.
+        if self.__max_concurrency_option is not None:
+            self.__max_concurrency = self.__max_concurrency_option
+        executor = self.__executor_option
+        if executor is None:
+            executor = PYNOTI_EXECUTOR_THREAD if self.__max_concurrency > 1 else PYNOTI_EXECUTOR_LOOP
+        if executor == PYNOTI_EXECUTOR_LOOP:
+            self.__sync_executor = None
+        elif executor == PYNOTI_EXECUTOR_THREAD:
+            self.__owned_executor = ThreadPoolExecutor(
+                max_workers=self.__max_concurrency, thread_name_prefix=self.__log_prefix__()
+            )
+            self.__sync_executor = self.__owned_executor
+        elif executor == PYNOTI_EXECUTOR_PROCESS:
+            process_executor = PyNotiProcessExecutor(self.__workers)
+            if self.__max_concurrency_option is None:
+                self.__max_concurrency = process_executor.workers
+            self.__owned_executor = process_executor
+            self.__sync_executor = process_executor
+        elif isinstance(executor, Executor):
+            self.__sync_executor = executor
+
+    def set_idle_timeout(self, idle_timeout: float):
+        """tear down the worker thread and its event loop after the queue is idle for idle_timeout seconds.
+
+        They are created again by the next post, task ids and ordering are kept. 0 means never, the default.
+        It has no effect on the task queue running on a worker pool.
+        """
+        with self.__lock:
+            self.__idle_timeout = idle_timeout
 
     @property
     def is_terminated(self) -> bool:
         with self.__lock:
             return self.__is_terminated
 
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def add_trace_hooks(self, hooks: PyNotiTraceHooks):
+        """add hooks called before and after each task of the task queue, on the worker thread."""
+        with self.__lock:
+            self.__queue_trace_hooks = self.__queue_trace_hooks + (hooks,)
+            self.__trace_hooks = self.__queue_trace_hooks + self.__global_trace_hooks
+
+    def remove_trace_hooks(self, hooks: PyNotiTraceHooks):
+        with self.__lock:
+            self.__queue_trace_hooks = tuple(item for item in self.__queue_trace_hooks if item is not hooks)
+            self.__trace_hooks = self.__queue_trace_hooks + self.__global_trace_hooks
+
+    def set_global_trace_hooks(self, hooks: Tuple[PyNotiTraceHooks, ...]):
+        """set the hooks shared by all the task queues, called after the hooks of the task queue."""
+        with self.__lock:
+            self.__global_trace_hooks = hooks
+            self.__trace_hooks = self.__queue_trace_hooks + self.__global_trace_hooks
+
+    def set_watchdog(self, watchdog: Optional[PyNotiSlowTaskWatchdog]):
+        """report the slow tasks of the task queue to watchdog. None means no watchdog."""
+        with self.__lock:
+            self.__watchdog = watchdog
+
+    def set_recorder(self, recorder: Optional[PyNotiTraceRecorder]):
+        """record the post, schedule, start and finish events of the tasks. None means no recording."""
+        with self.__lock:
+            self.__recorder = recorder
+
+    def get_metrics(self) -> PyNotiQueueMetricsSnapshot:
+        """snapshot of the task counters, the depth and the wait time and run time histograms."""
+        with self.__lock:
+            return self.__metrics.snapshot(self.__name, len(self.__task_dict))
+
     @property
     def task_count(self) -> int:
         with self.__lock:
             return len(self.__task_dict)
 
-    def __terminate_thread_callback__(self, wait: bool) -> None:
-        # run in thread.
+    @property
+    def pending_task_count_by_priority(self) -> Dict[int, int]:
+        """tasks ready to execute, grouped by priority. delayed tasks are not counted until their timer fired."""
         with self.__lock:
-            if self.__is_terminated:
-                return
+            return self.__pending_tasks.depth()
+
+    def terminate(self, wait: bool = True, timeout: Optional[float] = None) -> List[PyNotiDroppedTask]:
+        """terminate thread and stop event loop.
 
+        Args:
+            wait (bool): block until the tasks complete and the thread exit. otherwise cancel the tasks.
+            timeout (Optional[float]): with wait, max seconds to wait, the tasks left at the deadline are dropped.
+
+        Returns:
+            List[PyNotiDroppedTask]: the tasks which were cancelled or abandoned.
+        """
+        logging.info(f"{self.__log_prefix__()}: Task queue terminate. wait: {wait}")
+        dropped_tasks = self.signal_terminate(wait)
+        if not wait:
+            utils.RunInThread(self.wait_terminated, None, executor=self.__thread_pool)
+            return dropped_tasks
+        deadline = None if timeout is None else time.monotonic() + timeout
+        dropped_tasks.extend(self.wait_terminated(deadline))
+        return dropped_tasks
+
+    def signal_terminate(self, wait: bool) -> List[PyNotiDroppedTask]:
+        """stop taking new task without blocking. if not wait, cancel the tasks which are not running."""
         with self.__lock:
+            if self.__is_terminated:
+                return []
             self.__is_terminated = True
             self.__wait_until_task_done = wait
-        if not wait:
-            self.__scheduler_runloop.call_soon_threadsafe(self.__cancel_scheduled_task__)
-        self.__wait_until_tasks_cleanup__()
+            # wake up the blocked producers, the queue will not take new task anymore.
+            self.__capacity_condition.notify_all()
+            if wait:
+                return []
+            return self.__drop_tasks__(include_running=False)
+
+    def wait_terminated(self, deadline: Optional[float] = None) -> List[PyNotiDroppedTask]:
+        """block until the tasks complete and the thread exit, after signal_terminate.
+
+        Args:
+            deadline (Optional[float]): time.monotonic() deadline. the tasks left at the deadline are dropped.
+        """
+        dropped_tasks: List[PyNotiDroppedTask] = []
+        if not self.__wait_until_tasks_cleanup__(deadline):
+            logging.warning(f"{self.__log_prefix__()}: tasks not complete before the deadline, drop them.")
+            dropped_tasks = self.__drop_tasks__(include_running=True)
 
         # stop run loop and wait for thread exit.
-        self.__execute_runloop.call_soon_threadsafe(self.__cleannup_thread__)
-        self.__wait_until_thread_exit__()
-
-    def terminate(self, wait: bool = True):
-        # terminate thread and stop event loop
-        logging.info(f"{self.__log_prefix__()}: Task queue terminate. wait: {wait}")
-        event = utils.RunInThread(self.__terminate_thread_callback__, wait, executor=self.__thread_pool)
-        if wait:
-            utils.Wait(event)
-
-    def set_preprocessor(self, preprocessor: Callable[..., Any]):
         with self.__lock:
-            self.__preprocessor = preprocessor
+            is_cleanup_scheduled = self.__is_cleanup_scheduled
+            self.__is_cleanup_scheduled = True
+            is_thread_running = self.__is_started or self.__worker_pool is not None
+        if not is_cleanup_scheduled:
+            if is_thread_running:
+                self.__execute_runloop.call_soon_threadsafe(self.__cleannup_thread__)
+            else:
+                # never started, or the idle worker thread was retired. no thread left to clean up.
+                self.__cleanup_stopped_runloop__()
+        if not self.__wait_until_thread_exit__(deadline):
+            logging.warning(f"{self.__log_prefix__()}: thread not exit before the deadline.")
+        return dropped_tasks
+
+    def __drop_tasks__(self, include_running: bool) -> List[PyNotiDroppedTask]:
+        dropped_tasks: List[PyNotiDroppedTask] = []
+        with self.__lock:
+            for task_id in list(self.__task_dict.keys()):
+                is_running = task_id in self.__executing_task_ids
+                if is_running and not include_running:
+                    continue
+                task = self.__task_dict[task_id]
+                dropped_tasks.append(PyNotiDroppedTask(self.__name, str(task_id), task.fn_name, is_running))
+                if is_running:
+                    # can not stop a running task, forget it. it is counted as executed when it returns.
+                    self.__pop_task__(task_id)
+                else:
+                    self.__cancel_task__(task_id)
+        return dropped_tasks
+
+    def set_preprocessor(self, preprocessor: Optional[Callable[..., Any]]):
+        """replace the preprocessors by preprocessor. None means no preprocessor."""
+        self.__set_preprocessors__(() if preprocessor is None else (preprocessor,))
+
+    def add_preprocessor(self, preprocessor: Callable[..., Any]):
+        """append preprocessor to the chain.
+
+        preprocessor(fn, *args, **kwargs) -> bool is called before fn, sync or async. The preprocessors run in order,
+        once one returns True the task is handled and neither the following ones nor fn are called.
+        The chain is compiled once, the tasks posted before the change keep the old chain.
+        """
+        with self.__lock:
+            self.__set_preprocessors__(self.__task_config.preprocessors + (preprocessor,))
 
-    def post_task(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
-        return self.post_task_with_delay(0, fn, *args, **kwargs)
+    def remove_preprocessor(self, preprocessor: Callable[..., Any]):
+        with self.__lock:
+            preprocessors = tuple(p for p in self.__task_config.preprocessors if p != preprocessor)
+            self.__set_preprocessors__(preprocessors)
 
-    def post_task_with_delay(self, delay: float, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> str:
-        task_id = ""
+    def __set_preprocessors__(self, preprocessors: Tuple[Callable[..., Any], ...]):
+        with self.__lock:
+            self.__task_config = PyNotiTaskConfig(preprocessors, self.__task_config.fn_with_task_id)
+
+    def post_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> str:
+        """post task. the higher priority task is executed first, same priority tasks keep FIFO order."""
+        return self.post_task_with_delay(0, fn, *args, priority=priority, **kwargs)
+
+    def post_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> str:
+        task = self.__post_task__(delay, fn, args, kwargs, priority, False)
+        if task is None:
+            return ""
+        return str(task.task_id)
+
+    def submit_task(self, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any) -> PyNotiTaskHandle:
+        """post task and return a handle carrying the result of fn.
+
+        The handle is a concurrent.futures.Future which can also be awaited, cancel the handle cancel the task.
+        """
+        return self.submit_task_with_delay(0, fn, *args, priority=priority, **kwargs)
+
+    def submit_task_with_delay(
+        self, delay: float, fn: Callable[..., Any], *args: Any, priority: int = 0, **kwargs: Any
+    ) -> PyNotiTaskHandle:
+        task = self.__post_task__(delay, fn, args, kwargs, priority, True)
+        if task is None or task.handle is None:
+            # task queue is terminated, return a cancelled handle.
+            handle = PyNotiTaskHandle("")
+            handle.cancel()
+            return handle
+        return task.handle
+
+    def post_fanout_task(self, fns: Sequence[Callable[..., Any]], *args: Any, priority: int = 0, **kwargs: Any) -> str:
+        """post one task which calls fns in order with the same args.
+
+        An exception raised by one fn is logged and does not stop the following fns.
+        """
+        return self.post_resolved_fanout_task(tuple(fns), fanout_is_async(fns), args, kwargs, priority=priority)
+
+    def post_resolved_fanout_task(
+        self,
+        fns: Tuple[Callable[..., Any], ...],
+        is_async: Tuple[bool, ...],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        *,
+        priority: int = 0,
+    ) -> str:
+        """post_fanout_task with is_async of fns resolved beforehand, see fanout_is_async.
+
+        For the caller posting the same fns many times, pass the same is_async tuple, the invokers are cached by it.
+        """
+        task = self.__post_task__(0, fns, args, kwargs, priority, False, fanout_is_async=is_async)
+        return "" if task is None else str(task.task_id)
+
+    def post_coalesced_fanout_task(
+        self,
+        key: Hashable,
+        fns: Tuple[Callable[..., Any], ...],
+        args: Sequence[Any],
+        kwargs: Dict[str, Any],
+        *,
+        reducer: Optional[Callable[..., Tuple[Tuple[Any, ...], Dict[str, Any]]]] = None,
+        debounce: float = 0,
+        throttle: float = 0,
+        is_async: Optional[Tuple[bool, ...]] = None,
+    ) -> str:
+        """post a fan-out task, or merge args into the task of key which is still waiting.
+
+        Args:
+            key (Hashable): tasks with the same key and fns are merged.
+            is_async (Optional[Tuple[bool, ...]]): resolved beforehand, see post_resolved_fanout_task.
+                None means resolve it from fns.
+            reducer (Optional[Callable]): reducer((args, kwargs), (args, kwargs)) -> (args, kwargs).
+                None means the new args replace the waiting ones.
+            debounce (float): delay the task until no new args for debounce seconds.
+            throttle (float): start the tasks of key at most once every throttle seconds.
+        """
         with self.__lock:
             if self.is_terminated:
                 logging.info(f"{self.__log_prefix__():}: task queue is terminated. ignore new task.")
                 return ""
 
+            task_id = self.__coalesce_fanout_tasks.get(key)
+            task = self.__task_dict.get(task_id) if task_id is not None else None
+            # compare by value, the observer group is published again with a new fns tuple on any observer change.
+            if task is not None and task.fn == fns and task.task_id not in self.__executing_task_ids:
+                if reducer is not None:
+                    args, kwargs = reducer((task.args, task.kwargs), (tuple(args), kwargs))
+                task.set_args(*args, **kwargs)
+                if debounce > 0 and task.delay > 0:
+                    # the delay timer has not fired yet, restart it.
+                    task.reset_timer_handle(
+                        self.__timer_wheel.arm(debounce, self.__schedule_task_callback, task.task_id)
+                    )
+                return str(task.task_id)
+
+            delay = debounce
+            if throttle > 0:
+                now = time.monotonic()
+                start_time = max(now + delay, self.__throttle_times.get(key, 0))
+                self.__throttle_times[key] = start_time + throttle
+                delay = start_time - now
+            if is_async is None:
+                is_async = fanout_is_async(fns)
+            task = self.__post_task__(delay, fns, tuple(args), dict(kwargs), 0, False, fanout_is_async=is_async)
+            if task is None:
+                return ""
+            self.__coalesce_fanout_tasks[key] = task.task_id
+            return str(task.task_id)
+
+    def __post_task__(
+        self,
+        delay: float,
+        fn: PyNotiTaskFn,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        priority: int,
+        with_handle: bool,
+        fanout_is_async: Optional[Tuple[bool, ...]] = None,
+    ) -> Optional[PyNotiTask]:
+        with self.__lock:
+            if self.is_terminated:
+                logging.info(f"{self.__log_prefix__():}: task queue is terminated. ignore new task.")
+                return None
+
+            if self.__max_pending > 0 and len(self.__task_dict) >= self.__max_pending:
+                admitted, existing_task = self.__handle_overflow__(fn, args, kwargs)
+                if not admitted:
+                    return existing_task
+
             # add task
-            task_id = str(self.__task_id_count + 1)
             self.__task_id_count += 1
-            task = PyNotiTask(task_id, delay, fn, self.__preprocessor, *args, executor=self.__thread_pool, **kwargs)
-            task.set_with_task_id(self.__fn_with_task_id)
+            task_id = self.__task_id_count
+            task_config = self.__task_config
+            fanout_invokers = None if fanout_is_async is None else task_config.fanout_invokers(fanout_is_async)
+            task = PyNotiTask(task_id, delay, fn, task_config, args, kwargs, fanout_invokers)
+            task.set_priority(priority)
+            if with_handle:
+                task.set_handle(PyNotiTaskHandle(str(task_id), self.cancel_task))
             self.__task_dict[task_id] = task
+            self.__metrics.posted += 1
+            if self.__recorder is not None:
+                self.__recorder.record(PYNOTI_TRACE_POST, self.__name, task_id, task.fn_name)
+            if self.__overflow_policy == PyNotiOverflowPolicy.COALESCE and self.__max_pending > 0:
+                self.__index_coalesce_task__(task)
             self.__tasks_update_callback__()
 
-            # start thread
-            if not self.__is_started:
-                self.__is_started = True
-                self.__execute_task_thread.start()
+            self.__start_worker_thread__()
+
+            # dispatch task. immediate task go straight to the worker run loop,
+            # delayed task arm a timer which fire on the scheduler thread.
+            if delay == 0:
+                task.set_ready_time(time.monotonic())
+                self.__pending_tasks.append(task, priority)
+                self.__execute_runloop.call_soon_threadsafe(self.__wakeup_worker__)
+            else:
+                task.set_timer_handle(self.__timer_wheel.arm(delay, self.__schedule_task_callback, task_id))
+
+        return task
+
+    def post_tasks(
+        self, tasks: Iterable[Tuple[Callable[..., Any], Sequence[Any], Dict[str, Any]]], *, priority: int = 0
+    ) -> List[str]:
+        """post many tasks at once. tasks is an iterable of (fn, args, kwargs).
 
-            # dispatch task
-            self.__scheduler_runloop.call_soon_threadsafe(self.__schedule_task__, task_id)
+        Task ids are allocated in one step, the tasks are inserted under one lock acquisition
+        and the worker is woken once.
+        """
+        task_list = list(tasks)
+        task_ids: List[str] = []
+        with self.__lock:
+            if self.is_terminated:
+                logging.info(f"{self.__log_prefix__():}: task queue is terminated. ignore new tasks.")
+                return task_ids
+            if len(task_list) == 0:
+                return task_ids
+
+            if self.__max_pending > 0:
+                # bounded queue, admit the tasks one by one.
+                for fn, args, kwargs in task_list:
+                    task_ids.append(self.post_task(fn, *args, priority=priority, **kwargs))
+                return task_ids
+
+            # add tasks
+            first_task_id = self.__task_id_count + 1
+            self.__task_id_count += len(task_list)
+            self.__metrics.posted += len(task_list)
+            ready_time = time.monotonic()
+            task_config = self.__task_config
+            for i, (fn, args, kwargs) in enumerate(task_list):
+                task_id = first_task_id + i
+                task = PyNotiTask(task_id, 0, fn, task_config, tuple(args), dict(kwargs))
+                task.set_priority(priority)
+                task.set_ready_time(ready_time)
+                self.__task_dict[task_id] = task
+                if self.__recorder is not None:
+                    self.__recorder.record(PYNOTI_TRACE_POST, self.__name, task_id, task.fn_name)
+                self.__pending_tasks.append(task, priority)
+                task_ids.append(str(task_id))
+            self.__tasks_update_callback__()
+
+            self.__start_worker_thread__()
+            self.__execute_runloop.call_soon_threadsafe(self.__wakeup_worker__)
+
+        return task_ids
+
+    def __handle_overflow__(
+        self, fn: PyNotiTaskFn, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Tuple[bool, Optional[PyNotiTask]]:
+        # call with lock held and the queue is full. return (admitted, the task which absorbs the new task).
+        policy = self.__overflow_policy
+        if policy == PyNotiOverflowPolicy.BLOCK:
+            if self.__is_in_execute_runloop__() or PYNOTI_RUNNING_TASK_QUEUE.get() is self:
+                # blocking the worker thread, or a task the worker waits for, would never free any room.
+                raise PyNotiQueueFullError(f"{self.__log_prefix__()}: task queue is full, can not block worker.")
+            deadline = None if self.__overflow_timeout is None else time.monotonic() + self.__overflow_timeout
+            while len(self.__task_dict) >= self.__max_pending and self.__max_pending > 0:
+                if self.__is_terminated:
+                    return False, None
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    raise PyNotiQueueFullError(f"{self.__log_prefix__()}: task queue is full, wait timeout.")
+                self.__capacity_condition.wait(timeout)
+            return not self.__is_terminated, None
+
+        if policy == PyNotiOverflowPolicy.REJECT:
+            raise PyNotiQueueFullError(f"{self.__log_prefix__()}: task queue is full. max: {self.__max_pending}")
+
+        if policy == PyNotiOverflowPolicy.DROP_OLDEST:
+            for task_id in self.__task_dict:
+                if task_id not in self.__executing_task_ids:
+                    logging.debug(f"{self.__log_prefix__()}: task queue is full, drop oldest task {task_id}.")
+                    self.__cancel_task__(task_id)
+                    return True, None
+            return True, None
+
+        if policy == PyNotiOverflowPolicy.COALESCE:
+            task = self.__find_coalesce_task__(fn)
+            if task is not None:
+                task.set_args(*args, **kwargs)
+                return False, task
+
+        logging.debug(f"{self.__log_prefix__()}: task queue is full, drop new task.")
+        return False, None
+
+    def __is_in_execute_runloop__(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.__execute_runloop
+        except RuntimeError:
+            return False
+
+    def __index_coalesce_task__(self, task: PyNotiTask):
+        try:
+            self.__coalesce_index[task.fn] = task.task_id
+        except TypeError:
+            # unhashable callable can not be coalesced.
+            pass
 
-        return task_id
+    def __find_coalesce_task__(self, fn: PyNotiTaskFn) -> Optional[PyNotiTask]:
+        try:
+            task_id = self.__coalesce_index.get(fn)
+        except TypeError:
+            return None
+        if task_id is None or task_id in self.__executing_task_ids:
+            return None
+        return self.__task_dict.get(task_id)
+
+    def __start_worker_thread__(self):
+        with self.__lock:
+            if not self.__is_started:
+                self.__is_started = True
+                if not self.__is_executor_resolved:
+                    self.__is_executor_resolved = True
+                    self.__resolve_sync_executor__()
+                if self.__worker_pool is None:
+                    self.__execute_task_thread.start()
 
     def cancel_task(self, task_id: str) -> None:
+        try:
+            self.__cancel_task__(int(task_id))
+        except ValueError:
+            logging.info(f"{self.__log_prefix__()}: cancel unknown task {task_id}")
+
+    def __cancel_task__(self, task_id: int):
         logging.info(f"{self.__log_prefix__()}: cancel task {task_id}")
         task: Optional[PyNotiTask] = None
         with self.__lock:
             task = self.__pop_task__(task_id)
+            if task is not None:
+                self.__metrics.cancelled += 1
         if task is not None:
-            self.__scheduler_runloop.call_soon_threadsafe(task.cancel)
+            task.cancel()
 
-    def __pop_task__(self, task_id: str) -> Optional[PyNotiTask]:
+    def __pop_task__(self, task_id: int) -> Optional[PyNotiTask]:
         with self.__lock:
             if task_id in self.__task_dict:
                 task = self.__task_dict.pop(task_id)
@@ -121,66 +662,96 @@ class PyNotiTaskQueue:
                 return task
         return None
 
+    def __finish_task__(self, task_id: int):
+        # call from worker thread with lock held after the task ran, remove it at once so it is never seen as pending.
+        self.__executing_task_ids.discard(task_id)
+        if self.__task_dict.pop(task_id, None) is None:
+            return
+        # the depth only went down, the callback matters when the queue turns empty or frees room.
+        if len(self.__task_dict) == 0 or self.__max_pending > 0:
+            self.__tasks_update_callback__()
+        if len(self.__task_dict) == 0:
+            # a concurrent task may finish after the drain loop exits, the queue turns idle here.
+            self.__arm_idle_timer__()
+
     def __tasks_update_callback__(self):
         # call from scheduler thread
         with self.__lock:
-            logging.info(f"{self.__log_prefix__()}: tasks count change. total: {self.task_count}")
-            if self.task_count == 0:
-                self.__tasks_counter_signal.set()
-            else:
+            depth = len(self.__task_dict)
+            if depth > self.__metrics.max_depth:
+                self.__metrics.max_depth = depth
+            is_busy = depth > 0
+            if is_busy:
                 self.__tasks_counter_signal.clear()
+            else:
+                self.__tasks_counter_signal.set()
+            if is_busy != self.__is_busy:
+                self.__is_busy = is_busy
+                if self.__busy_listener is not None:
+                    self.__busy_listener(is_busy)
+            if self.__max_pending > 0:
+                self.__capacity_condition.notify_all()
 
     def __log_prefix__(self):
         return f"TaskQueue[{self.__name}]"
 
-    def __wait_until_tasks_cleanup__(self):
+    def __wait_until_tasks_cleanup__(self, deadline: Optional[float] = None) -> bool:
         # wait for all task finish
         task_count = self.task_count
         logging.info(f"{self.__log_prefix__()}: waiting for tasks cleanup. tasks: {task_count}")
         begin_time = time.time()
         if task_count == 0:
             logging.info(f"{self.__log_prefix__()}: All tasks cleanup.")
-            return
+            return True
 
-        while not self.__tasks_counter_signal.is_set():
-            self.__tasks_counter_signal.wait(PYNOTI_INTERVAL)
-            wait_time = time.time() - begin_time
-            logging.debug(
-                f"{self.__log_prefix__()}: waiting for tasks finish. time: {wait_time:0.3f} tasks: {self.task_count}"
-            )
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not self.__tasks_counter_signal.wait(timeout):
+            return False
         wait_time = time.time() - begin_time
         logging.info(f"{self.__log_prefix__()}: All tasks cleanup. wait time: {wait_time:0.3f}")
+        return True
 
-    def __wait_until_thread_exit__(self):
+    def __wait_until_thread_exit__(self, deadline: Optional[float] = None) -> bool:
         logging.info(f"{self.__log_prefix__()}: waiting for thread exit.")
         begin_time = time.time()
         with self.__lock:
             if not self.__is_started:
                 self.__execute_thread_event.set()
-        while not self.__execute_thread_event.is_set():
-            self.__execute_thread_event.wait(PYNOTI_INTERVAL)
-            wait_time = time.time() - begin_time
-            logging.debug(f"{self.__log_prefix__()}: waiting for thread exit. time: {wait_time:0.3f}")
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        if not self.__execute_thread_event.wait(timeout):
+            return False
         wait_time = time.time() - begin_time
         logging.info(f"{self.__log_prefix__()}: thread exit. wait time: {wait_time:0.3f}")
+        return True
 
     def __cancel_scheduled_task__(self):
         logging.info(f"{self.__log_prefix__()}: cancel scheduled task.")
-        with self.__lock:
-            task_ids: List[str] = []
-            task_ids.extend(self.__task_dict.keys())
-            for task_id in task_ids:
-                self.cancel_task(task_id)
+        self.__drop_tasks__(include_running=False)
 
     def __cleannup_thread__(self):
+        if self.__worker_pool is not None:
+            # the event loop is shared, give it back to the worker pool.
+            logging.info(f"{self.__log_prefix__()}: release event run loop.")
+            self.__worker_pool.release_runloop(self.__execute_runloop)
+            self.__shutdown_owned_executor__()
+            self.__execute_thread_event.set()
+            return
         logging.info(f"{self.__log_prefix__()}: stop event run loop.")
         with self.__lock:
             self.__execute_runloop.stop()
 
-    def __schedule_task__(self, task_id: str):
-        # call from scheduler thread, asyncio event loop.
-        need_execute = False
-        delay = 0
+    def __cleanup_stopped_runloop__(self):
+        logging.info(f"{self.__log_prefix__()}: close event run loop.")
+        with self.__lock:
+            self.__execute_runloop.close()
+        self.__shutdown_owned_executor__()
+
+    def __shutdown_owned_executor__(self):
+        if self.__owned_executor is not None:
+            self.__owned_executor.shutdown(wait=False)
+
+    def __schedule_task__(self, task_id: int):
+        # call from scheduler thread, when the delay timer of the task fired.
         task: Optional[PyNotiTask] = None
         with self.__lock:
             # check task exist or not
@@ -196,21 +767,17 @@ class PyNotiTaskQueue:
                 self.__pop_task__(task_id)
                 return
 
-            # if task have delay, reschedule task. otherwise, add task to pending list.
-            if task.delay == 0:
-                need_execute = True
-            else:
-                delay = task.delay
-                handler = self.__scheduler_runloop.call_later(delay, self.__schedule_task__, task_id)
-                task.set_delay(0)
-                task.set_timer_handle(handler)
+            # delay timer fired, add task to pending list, waiting for execution.
+            task.set_delay(0)
+            task.set_ready_time(time.monotonic())
+            if self.__recorder is not None:
+                self.__recorder.record(PYNOTI_TRACE_SCHEDULE, self.__name, task_id, task.fn_name)
+            self.__pending_tasks.append(task, task.priority)
+        self.__execute_runloop.call_soon_threadsafe(self.__wakeup_worker__)
 
-        if need_execute:
-            # add to pending list, waiting for execution.
-            with self.__lock:
-                self.__pending_tasks.append(task)
-            f = lambda: asyncio.ensure_future(self.__check_and_execute_tasks__())
-            self.__execute_runloop.call_soon_threadsafe(f)
+    def __wakeup_worker__(self):
+        # call from worker thread, asyncio event loop.
+        asyncio.ensure_future(self.__check_and_execute_tasks__())
 
     async def __check_and_execute_tasks__(self):
         # call from worker thread, only one processor to execute the task queue.
@@ -220,29 +787,174 @@ class PyNotiTaskQueue:
                 return
             self.__is_executing = True
 
-        task: Optional[PyNotiTask] = None
         while True:
+            # take a batch of the highest priority pending tasks in one lock acquisition.
+            batch: Deque[PyNotiTask]
             with self.__lock:
                 if len(self.__pending_tasks) == 0:
-                    break
-                task = self.__pending_tasks.pop(0)
-                if task is not None:
-                    if task.task_id not in self.__task_dict:
-                        task.cancel()
-                        task = None
-            if task is None:
+                    self.__is_executing = False
+                    self.__arm_idle_timer__()
+                    return
+                batch = self.__pending_tasks.pop_batch(self.__max_batch)
+
+            if self.__max_concurrency > 1:
+                await self.__start_concurrent_tasks__(batch)
                 continue
 
-            await task.execute()
-            self.__pop_task__(task.task_id)
+            # the tasks of a batch share one priority.
+            priority = batch[0].priority
+            pending_tasks = self.__pending_tasks
+            task_dict = self.__task_dict
+            task: Optional[PyNotiTask] = None
+            while True:
+                # one lock acquisition per task, finish the task which ran and take the next one.
+                with self.__lock:
+                    if task is not None:
+                        self.__finish_task__(task.task_id)
+                        task = None
+                    if len(batch) == 0:
+                        break
+                    if pending_tasks.top_priority > priority:
+                        # a higher priority task came while the batch is running, give the rest back.
+                        pending_tasks.push_front(batch, priority)
+                        break
+                    task = batch.popleft()
+                    task_id = task.task_id
+                    if task_id not in task_dict:
+                        # task has been cancelled.
+                        task = None
+                        continue
+                    # mark under lock, producers only change the args of the tasks not executing.
+                    self.__executing_task_ids.add(task_id)
+                await self.__run_task__(task)
+
+            if self.__max_batch > 0:
+                # yield to the event loop between batches.
+                await asyncio.sleep(0)
+
+    def __arm_idle_timer__(self):
+        # call from worker thread with lock held, when the queue may turn idle.
+        if self.__idle_timeout <= 0 or self.__worker_pool is not None:
+            return
+        self.__last_active_time = time.monotonic()
+        if not self.__idle_timer_armed:
+            self.__idle_timer_armed = True
+            self.__execute_runloop.call_later(self.__idle_timeout, self.__check_idle__)
 
+    def __check_idle__(self):
+        # call from worker thread. once idle for long enough, retire the thread and its event loop.
         with self.__lock:
-            self.__is_executing = False
+            self.__idle_timer_armed = False
+            if self.__is_terminated or self.__idle_timeout <= 0:
+                return
+            if len(self.__task_dict) > 0 or self.__is_executing:
+                # the drain loop or the last running task arms the idle timer again when it finishes.
+                return
+            idle_time = time.monotonic() - self.__last_active_time
+            if idle_time < self.__idle_timeout:
+                self.__idle_timer_armed = True
+                self.__execute_runloop.call_later(self.__idle_timeout - idle_time, self.__check_idle__)
+                return
 
-    def __worker_thread__(self):
+            logging.info(f"{self.__log_prefix__()}: idle for {idle_time:0.3f}s, retire worker thread.")
+            # the next post starts a new thread with a new event loop.
+            retired_runloop = self.__execute_runloop
+            self.__execute_runloop = asyncio.new_event_loop()
+            self.__execute_task_thread = threading.Thread(
+                target=self.__worker_thread__, args=(self.__execute_runloop,)
+            )
+            self.__concurrency_semaphore = None
+            self.__is_started = False
+            retired_runloop.stop()
+
+    def __preempt_batch__(self, batch: Deque[PyNotiTask]) -> bool:
+        # call with lock held. a higher priority task came while the batch is running, give the rest back.
+        priority = batch[0].priority
+        if not self.__pending_tasks.has_higher_priority(priority):
+            return False
+        self.__pending_tasks.push_front(batch, priority)
+        return True
+
+    async def __start_concurrent_tasks__(self, batch: Deque[PyNotiTask]):
+        # call from worker thread, start tasks in order, at most max_concurrency tasks are running.
+        if self.__concurrency_semaphore is None:
+            self.__concurrency_semaphore = asyncio.Semaphore(self.__max_concurrency)
+        while len(batch) > 0:
+            await self.__concurrency_semaphore.acquire()
+            with self.__lock:
+                if self.__preempt_batch__(batch):
+                    self.__concurrency_semaphore.release()
+                    return
+                task = batch.popleft()
+                if task.task_id not in self.__task_dict:
+                    # task has been cancelled.
+                    self.__concurrency_semaphore.release()
+                    continue
+                self.__executing_task_ids.add(task.task_id)
+            asyncio.ensure_future(self.__execute_concurrent_task__(task))
+
+    async def __execute_concurrent_task__(self, task: PyNotiTask):
+        try:
+            await self.__run_task__(task)
+        finally:
+            with self.__lock:
+                self.__finish_task__(task.task_id)
+            if self.__concurrency_semaphore is not None:
+                self.__concurrency_semaphore.release()
+
+    async def __run_task__(self, task: PyNotiTask):
+        # call from worker thread, execute the task and record the metrics.
+        metrics = self.__metrics
+        start_time = time.monotonic()
+        wait_time = start_time - task.ready_time
+        metrics.wait_time.observe(wait_time)
+        trace_hooks = self.__trace_hooks
+        watchdog = self.__watchdog
+        if len(trace_hooks) > 0:
+            trace = PyNotiTaskTrace(self.__name, str(task.task_id), task.fn_name, wait_time)
+            self.__call_trace_hooks__([hooks.before for hooks in trace_hooks], trace)
+        if watchdog is not None:
+            watchdog.task_started(self.__name, task.task_id, task.fn_name, start_time)
+        recorder = self.__recorder
+        if recorder is not None:
+            recorder.record(PYNOTI_TRACE_START, self.__name, task.task_id, task.fn_name)
+
+        token = PYNOTI_RUNNING_TASK_QUEUE.set(self)
+        try:
+            error = await task.execute(self.__sync_executor)
+        finally:
+            PYNOTI_RUNNING_TASK_QUEUE.reset(token)
+
+        if recorder is not None:
+            recorder.record(PYNOTI_TRACE_FINISH, self.__name, task.task_id, task.fn_name)
+        run_time = time.monotonic() - start_time
+        metrics.run_time.observe(run_time)
+        metrics.executed += 1
+        if error is not None:
+            metrics.failed += 1
+        if watchdog is not None:
+            watchdog.task_finished(self.__name, task.task_id)
+        if len(trace_hooks) > 0:
+            trace = PyNotiTaskTrace(self.__name, str(task.task_id), task.fn_name, wait_time, run_time, error)
+            if error is None:
+                self.__call_trace_hooks__([hooks.after for hooks in trace_hooks], trace)
+            else:
+                self.__call_trace_hooks__([hooks.error for hooks in trace_hooks], trace)
+
+    def __call_trace_hooks__(
+        self, hook_list: List[Optional[Callable[[PyNotiTaskTrace], None]]], trace: PyNotiTaskTrace
+    ):
+        for hook in hook_list:
+            if hook is None:
+                continue
+            try:
+                hook(trace)
+            except Exception as e:
+                logging.error(e)
+
+    def __worker_thread__(self, loop: asyncio.AbstractEventLoop):
         logging.info(f"{self.__log_prefix__()}: worker thread begin.")
-        loop = self.__execute_runloop
-        asyncio.set_event_loop(self.__execute_runloop)
+        asyncio.set_event_loop(loop)
         with self.__lock:
             if self.__is_terminated and not self.__wait_until_task_done:
                 # terminate before the thread start. cancel the schedule task again
@@ -253,5 +965,11 @@ class PyNotiTaskQueue:
         finally:
             loop.run_until_complete(loop.shutdown_asyncgens())
             loop.close()
-            logging.info(f"{self.__log_prefix__()}: worker thread end.")
-            self.__execute_thread_event.set()
+            with self.__lock:
+                is_retired = loop is not self.__execute_runloop
+            if is_retired:
+                logging.info(f"{self.__log_prefix__()}: idle worker thread end.")
+            else:
+                self.__shutdown_owned_executor__()
+                logging.info(f"{self.__log_prefix__()}: worker thread end.")
+                self.__execute_thread_event.set()
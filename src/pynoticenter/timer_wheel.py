@@ -0,0 +1,213 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PYNOTI_TIMER_RESOLUTION = 0.01
+PYNOTI_TIMER_SLOTS = 512
+
+
+class PyNotiTimerHandle:
+    """PyNotiTimerHandle, returned by PyNotiTimerWheel.arm. The same interface as asyncio.TimerHandle."""
+
+    __slots__ = ("wheel", "expire_tick", "bucket", "callback", "args", "is_cancelled")
+
+    def __init__(
+        self,
+        wheel: "PyNotiTimerWheel",
+        expire_tick: int,
+        callback: Callable[..., Any],
+        args: Tuple[Any, ...],
+    ):
+        self.wheel: PyNotiTimerWheel = wheel
+        self.expire_tick: int = expire_tick
+        # the slot or the overflow bucket holding the timer, None once it fired or was cancelled.
+        self.bucket: Optional[Dict[PyNotiTimerHandle, None]] = None
+        self.callback: Optional[Callable[..., Any]] = callback
+        self.args: Tuple[Any, ...] = args
+        self.is_cancelled: bool = False
+
+    def cancel(self):
+        self.wheel.cancel(self)
+
+    def cancelled(self) -> bool:
+        return self.is_cancelled
+
+
+class PyNotiTimerWheel:
+    """PyNotiTimerWheel, hierarchical timer wheel driven by an asyncio event loop. All function thread safety.
+
+    Arm and cancel are O(1) and a cancelled timer is released immediately. Timers fire on the run loop thread,
+    in arm order for the same tick, never earlier than their delay and at most one resolution later.
+    The slots hold the timers of the next revolution, one tick per slot, so a tick only touches due timers.
+    Farther timers wait in an overflow bucket per revolution, moved into the slots when their revolution comes.
+    The run loop sleeps until the next slot with timers, or until the next bucket is due.
+    """
+
+    def __init__(
+        self,
+        runloop: asyncio.AbstractEventLoop,
+        resolution: float = PYNOTI_TIMER_RESOLUTION,
+        slot_count: int = PYNOTI_TIMER_SLOTS,
+    ):
+        if resolution <= 0:
+            raise ValueError("timer resolution must be positive.")
+        if slot_count <= 0:
+            raise ValueError("timer slot count must be positive.")
+        self.__runloop: asyncio.AbstractEventLoop = runloop
+        self.__resolution: float = resolution
+        self.__lock: threading.Lock = threading.Lock()
+        # dict as ordered set, keep arm order of the timers in the same slot.
+        self.__slots: List[Dict[PyNotiTimerHandle, None]] = [{} for _ in range(slot_count)]
+        # revolution (expire_tick // slot_count) -> timers beyond the slots.
+        self.__overflow: Dict[int, Dict[PyNotiTimerHandle, None]] = {}
+        self.__start_time: float = time.monotonic()
+        self.__processed_tick: int = 0
+        self.__timer_count: int = 0
+        self.__slot_timer_count: int = 0
+        self.__is_ticking: bool = False
+        # the tick the run loop wakes up for. its asyncio timer is touched on the run loop thread only.
+        self.__wakeup_tick: int = 0
+        self.__wakeup_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def resolution(self) -> float:
+        return self.__resolution
+
+    @property
+    def timer_count(self) -> int:
+        with self.__lock:
+            return self.__timer_count
+
+    def arm(self, delay: float, callback: Callable[..., Any], *args: Any) -> PyNotiTimerHandle:
+        deadline = time.monotonic() + delay - self.__start_time
+        expire_tick = math.ceil(deadline / self.__resolution)
+        with self.__lock:
+            need_wakeup = not self.__is_ticking
+            if need_wakeup:
+                self.__is_ticking = True
+                self.__processed_tick = self.__current_tick__()
+            expire_tick = max(expire_tick, self.__processed_tick + 1)
+            handle = PyNotiTimerHandle(self, expire_tick, callback, args)
+            wakeup_tick = self.__insert__(handle)
+            self.__timer_count += 1
+            if need_wakeup or wakeup_tick < self.__wakeup_tick:
+                # the run loop is not ticking, or sleeps past the new timer.
+                self.__wakeup_tick = wakeup_tick
+                need_wakeup = True
+        if need_wakeup:
+            self.__runloop.call_soon_threadsafe(self.__schedule_tick__)
+        return handle
+
+    def cancel(self, handle: PyNotiTimerHandle):
+        with self.__lock:
+            if handle.is_cancelled:
+                return
+            handle.is_cancelled = True
+            bucket = handle.bucket
+            if bucket is not None:
+                del bucket[handle]
+                self.__timer_count -= 1
+                slot_count = len(self.__slots)
+                if bucket is self.__slots[handle.expire_tick % slot_count]:
+                    self.__slot_timer_count -= 1
+                elif len(bucket) == 0:
+                    # no wakeup for an empty revolution.
+                    del self.__overflow[handle.expire_tick // slot_count]
+            handle.bucket = None
+            handle.callback = None
+            handle.args = ()
+
+    def __insert__(self, handle: PyNotiTimerHandle) -> int:
+        # call with lock held. put the timer into its slot or overflow bucket, return the tick to wake up for it.
+        slot_count = len(self.__slots)
+        expire_tick = handle.expire_tick
+        if expire_tick <= self.__processed_tick + slot_count:
+            bucket = self.__slots[expire_tick % slot_count]
+            self.__slot_timer_count += 1
+            wakeup_tick = expire_tick
+        else:
+            revolution = expire_tick // slot_count
+            bucket = self.__overflow.setdefault(revolution, {})
+            wakeup_tick = revolution * slot_count - 1
+        bucket[handle] = None
+        handle.bucket = bucket
+        return wakeup_tick
+
+    def __next_tick__(self, processed_tick: int) -> int:
+        # call with lock held and timers armed. the first slot with timers, or the tick before the next revolution.
+        slot_count = len(self.__slots)
+        next_tick = processed_tick + slot_count
+        if len(self.__overflow) > 0:
+            next_tick = min(next_tick, min(self.__overflow) * slot_count - 1)
+        if self.__slot_timer_count > 0:
+            for tick in range(processed_tick + 1, next_tick):
+                if len(self.__slots[tick % slot_count]) > 0:
+                    return tick
+        return next_tick
+
+    def __current_tick__(self) -> int:
+        return int((time.monotonic() - self.__start_time) / self.__resolution)
+
+    def __schedule_tick__(self):
+        # call from run loop thread, wake up at the start of the wakeup tick.
+        with self.__lock:
+            if not self.__is_ticking:
+                return
+            wakeup_tick = max(self.__wakeup_tick, self.__processed_tick + 1)
+        if self.__wakeup_handle is not None:
+            self.__wakeup_handle.cancel()
+        delay = self.__start_time + wakeup_tick * self.__resolution - time.monotonic()
+        self.__wakeup_handle = self.__runloop.call_later(max(delay, 0), self.__on_tick__)
+
+    def __on_tick__(self):
+        # call from run loop thread, fire all the expired timers.
+        self.__wakeup_handle = None
+        expired: List[PyNotiTimerHandle] = []
+        current_tick = self.__current_tick__()
+        with self.__lock:
+            slot_count = len(self.__slots)
+            processed_tick = self.__processed_tick
+            while True:
+                # the revolution whose ticks all come within the slots.
+                revolution = (processed_tick + 1) // slot_count
+                if revolution in self.__overflow:
+                    for handle in self.__overflow.pop(revolution):
+                        if handle.expire_tick <= processed_tick:
+                            # the run loop is late, the timer is already due.
+                            handle.bucket = None
+                            expired.append(handle)
+                        else:
+                            self.__insert__(handle)
+                if processed_tick >= current_tick:
+                    break
+                # skip the empty slots, stop at the tick before the next revolution with timers.
+                processed_tick = max(min(current_tick, self.__next_tick__(processed_tick)), processed_tick + 1)
+                slot = self.__slots[processed_tick % slot_count]
+                if len(slot) > 0:
+                    self.__slots[processed_tick % slot_count] = {}
+                    self.__slot_timer_count -= len(slot)
+                    for handle in slot:
+                        handle.bucket = None
+                    expired.extend(slot)
+            self.__processed_tick = processed_tick
+            self.__timer_count -= len(expired)
+            # decide the next tick under the lock, arm() starts a new tick when it sees the wheel stopped.
+            is_ticking = self.__timer_count > 0
+            self.__is_ticking = is_ticking
+            if is_ticking:
+                self.__wakeup_tick = self.__next_tick__(processed_tick)
+        if is_ticking:
+            self.__schedule_tick__()
+        if len(expired) > 1:
+            expired.sort(key=lambda handle: handle.expire_tick)
+
+        for handle in expired:
+            callback = handle.callback
+            if callback is None:
+                continue
+            args = handle.args
+            handle.callback = None
+            handle.args = ()
+            callback(*args)
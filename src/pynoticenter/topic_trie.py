@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Optional
+
+PYNOTI_TOPIC_SEPARATOR = "."
+PYNOTI_TOPIC_WILDCARD_ONE = "*"
+PYNOTI_TOPIC_WILDCARD_ANY = "#"
+PYNOTI_TOPIC_CACHE_SIZE = 4096
+
+
+def is_topic_pattern(name: str) -> bool:
+    """a topic pattern has a '*' segment, which matches one segment, or a '#' segment, which matches any segments."""
+    for segment in name.split(PYNOTI_TOPIC_SEPARATOR):
+        if segment == PYNOTI_TOPIC_WILDCARD_ONE or segment == PYNOTI_TOPIC_WILDCARD_ANY:
+            return True
+    return False
+
+
+class PyNotiTopicTrieNode:
+    __slots__ = ("children", "value")
+
+    def __init__(self):
+        self.children: Dict[str, PyNotiTopicTrieNode] = {}
+        self.value: Optional[Any] = None
+
+
+class PyNotiTopicTrie:
+    """PyNotiTopicTrie, index of topic patterns by segment. Not thread safety, the caller holds the lock.
+
+    Match walks the trie segment by segment, the cost depends on the topic depth, not on the pattern count.
+    """
+
+    def __init__(self):
+        self.__root: PyNotiTopicTrieNode = PyNotiTopicTrieNode()
+        self.__count: int = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def insert(self, pattern: str, value: Any):
+        node = self.__root
+        for segment in pattern.split(PYNOTI_TOPIC_SEPARATOR):
+            child = node.children.get(segment)
+            if child is None:
+                child = PyNotiTopicTrieNode()
+                node.children[segment] = child
+            node = child
+        if node.value is None:
+            self.__count += 1
+        node.value = value
+
+    def remove(self, pattern: str):
+        path: List[PyNotiTopicTrieNode] = [self.__root]
+        segments = pattern.split(PYNOTI_TOPIC_SEPARATOR)
+        for segment in segments:
+            child = path[-1].children.get(segment)
+            if child is None:
+                return
+            path.append(child)
+        if path[-1].value is None:
+            return
+        path[-1].value = None
+        self.__count -= 1
+        # prune the empty branch.
+        for i in range(len(segments), 0, -1):
+            node = path[i]
+            if node.value is not None or len(node.children) > 0:
+                break
+            del path[i - 1].children[segments[i - 1]]
+
+    def match(self, topic: str) -> List[Any]:
+        """values of the patterns which match topic, without duplicates."""
+        matched: Dict[int, Any] = {}
+        self.__match__(self.__root, topic.split(PYNOTI_TOPIC_SEPARATOR), 0, matched)
+        return list(matched.values())
+
+    def __match__(self, node: PyNotiTopicTrieNode, segments: List[str], index: int, matched: Dict[int, Any]):
+        children = node.children
+        any_child = children.get(PYNOTI_TOPIC_WILDCARD_ANY)
+        if any_child is not None:
+            # '#' matches the rest segments from zero to all.
+            for i in range(index, len(segments) + 1):
+                self.__match__(any_child, segments, i, matched)
+        if index == len(segments):
+            if node.value is not None:
+                matched.setdefault(id(node.value), node.value)
+            return
+        child = children.get(segments[index])
+        if child is not None:
+            self.__match__(child, segments, index + 1, matched)
+        one_child = children.get(PYNOTI_TOPIC_WILDCARD_ONE)
+        if one_child is not None:
+            self.__match__(one_child, segments, index + 1, matched)
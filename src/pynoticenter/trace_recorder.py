@@ -0,0 +1,96 @@
+import itertools
+import json
+import os
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Tuple, Union
+
+PYNOTI_TRACE_CAPACITY = 65536
+
+PYNOTI_TRACE_POST = "post"
+PYNOTI_TRACE_SCHEDULE = "schedule"
+PYNOTI_TRACE_START = "start"
+PYNOTI_TRACE_FINISH = "finish"
+
+# (time.monotonic(), event, queue, task id, fn name, thread id)
+PyNotiTraceEvent = Tuple[float, str, str, int, str, int]
+
+
+class PyNotiTraceRecorder:
+    """PyNotiTraceRecorder, record the scheduling events of the tasks into a preallocated ring buffer.
+
+    Recording takes no lock, the oldest events are overwritten once the buffer is full. The events are
+    dumped as Chrome trace JSON, which chrome://tracing and Perfetto open. A task is a complete slice on its
+    worker thread, linked by a flow arrow from the thread which posted it, delay timer firing is an instant event
+    on the scheduler thread.
+    """
+
+    def __init__(self, capacity: int = PYNOTI_TRACE_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("trace capacity must be positive.")
+        self.__capacity: int = capacity
+        self.__events: List[Optional[PyNotiTraceEvent]] = [None] * capacity
+        # next() of itertools.count is atomic, each event gets its own slot.
+        self.__counter = itertools.count()
+        self.__thread_names: Dict[int, str] = {}
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def record(self, event: str, queue: str, task_id: int, fn: str):
+        thread_id = threading.get_ident()
+        if thread_id not in self.__thread_names:
+            self.__thread_names[thread_id] = threading.current_thread().name
+        index = next(self.__counter)
+        self.__events[index % self.__capacity] = (time.monotonic(), event, queue, task_id, fn, thread_id)
+
+    def events(self) -> List[PyNotiTraceEvent]:
+        """the recorded events in time order."""
+        events = [event for event in self.__events if event is not None]
+        events.sort(key=lambda event: event[0])
+        return events
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        pid = os.getpid()
+        trace_events: List[Dict[str, Any]] = []
+        for thread_id, name in list(self.__thread_names.items()):
+            trace_events.append(
+                {"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id, "args": {"name": name}}
+            )
+        # start events waiting for their finish, by queue and task id. the tasks of a concurrent queue overlap
+        # on one thread, so a task is one complete event with its own duration, not a begin and end pair.
+        started: Dict[Tuple[str, int], Tuple[Dict[str, Any], str, Dict[str, str]]] = {}
+        for timestamp, event, queue, task_id, fn, thread_id in self.events():
+            base = {"cat": queue, "ts": timestamp * 1000000, "pid": pid, "tid": thread_id}
+            flow_id = f"{queue}:{task_id}"
+            args = {"queue": queue, "task_id": str(task_id)}
+            if event == PYNOTI_TRACE_START:
+                started[(queue, task_id)] = (base, fn, args)
+            elif event == PYNOTI_TRACE_FINISH:
+                start = started.pop((queue, task_id), None)
+                if start is None:
+                    # the start event was overwritten in the ring buffer.
+                    continue
+                start_base, _, start_args = start
+                duration = base["ts"] - start_base["ts"]
+                trace_events.append(dict(start_base, name=fn, ph="X", dur=duration, args=start_args))
+                # bind the flow arrow from the post event to the task slice.
+                trace_events.append(dict(start_base, name="task", ph="f", bp="e", id=flow_id))
+            else:
+                trace_events.append(dict(base, name=f"{event} {fn}", ph="i", s="t", args=args))
+                if event == PYNOTI_TRACE_POST:
+                    trace_events.append(dict(base, name="task", ph="s", id=flow_id))
+        for start_base, fn, start_args in started.values():
+            # still running when dumped.
+            trace_events.append(dict(start_base, name=f"start {fn}", ph="i", s="t", args=start_args))
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def dump(self, file: Union[str, IO[str]]):
+        """write Chrome trace JSON to file, a path or a text file object."""
+        trace = self.to_chrome_trace()
+        if isinstance(file, str):
+            with open(file, "w") as fp:
+                json.dump(trace, fp)
+        else:
+            json.dump(trace, file)
@@ -0,0 +1,110 @@
+import logging
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class PyNotiTaskTrace:
+    """passed to the trace hooks. run_time is 0 before the task runs."""
+
+    queue: str
+    task_id: str
+    fn: str
+    wait_time: float
+    run_time: float = 0
+    error: Optional[BaseException] = None
+
+
+@dataclass(frozen=True)
+class PyNotiTraceHooks:
+    """trace hooks of the tasks, called on the worker thread. error is called instead of after when fn raised."""
+
+    before: Optional[Callable[[PyNotiTaskTrace], None]] = None
+    after: Optional[Callable[[PyNotiTaskTrace], None]] = None
+    error: Optional[Callable[[PyNotiTaskTrace], None]] = None
+
+
+@dataclass(frozen=True)
+class PyNotiSlowTask:
+    """reported by the watchdog, stack is the stack of the worker thread when the task is found slow."""
+
+    queue: str
+    task_id: str
+    fn: str
+    run_time: float
+    stack: str
+
+
+def log_slow_task(slow_task: PyNotiSlowTask):
+    logging.warning(
+        f"TaskQueue[{slow_task.queue}]: task {slow_task.task_id} {slow_task.fn} "
+        f"is running for {slow_task.run_time:0.3f}s.\n{slow_task.stack}"
+    )
+
+
+class PyNotiSlowTaskWatchdog:
+    """PyNotiSlowTaskWatchdog, report the tasks running longer than threshold. All function thread safety.
+
+    Each slow task is reported once, with the stack of the worker thread. A sync task run by an executor
+    is not on the worker thread, the stack shows where the worker thread awaits it.
+    """
+
+    def __init__(self, threshold: float, callback: Optional[Callable[[PyNotiSlowTask], None]] = None):
+        if threshold <= 0:
+            raise ValueError("slow task threshold must be positive.")
+        self.__threshold: float = threshold
+        self.__callback: Callable[[PyNotiSlowTask], None] = callback if callback is not None else log_slow_task
+        self.__lock: threading.Lock = threading.Lock()
+        # key: (queue, task id), value: (fn name, start time, worker thread id)
+        self.__running_tasks: Dict[Tuple[str, int], Tuple[str, float, int]] = {}
+        self.__reported_tasks: Set[Tuple[str, int]] = set()
+        self.__stop_event: threading.Event = threading.Event()
+        self.__thread: threading.Thread = threading.Thread(
+            target=self.__watch_thread__, name="PyNotiWatchdog", daemon=True
+        )
+        self.__thread.start()
+
+    @property
+    def threshold(self) -> float:
+        return self.__threshold
+
+    def task_started(self, queue: str, task_id: int, fn: str, start_time: float):
+        # call from worker thread.
+        with self.__lock:
+            self.__running_tasks[(queue, task_id)] = (fn, start_time, threading.get_ident())
+
+    def task_finished(self, queue: str, task_id: int):
+        # call from worker thread.
+        with self.__lock:
+            self.__running_tasks.pop((queue, task_id), None)
+            self.__reported_tasks.discard((queue, task_id))
+
+    def stop(self):
+        self.__stop_event.set()
+        if threading.current_thread() is not self.__thread:
+            self.__thread.join()
+
+    def __watch_thread__(self):
+        interval = max(self.__threshold / 2, 0.01)
+        while not self.__stop_event.wait(interval):
+            now = time.monotonic()
+            slow_tasks: List[Tuple[Tuple[str, int], str, float, int]] = []
+            with self.__lock:
+                for key, (fn, start_time, thread_id) in self.__running_tasks.items():
+                    if now - start_time >= self.__threshold and key not in self.__reported_tasks:
+                        self.__reported_tasks.add(key)
+                        slow_tasks.append((key, fn, now - start_time, thread_id))
+            if len(slow_tasks) == 0:
+                continue
+            frames = sys._current_frames()
+            for (queue, task_id), fn, run_time, thread_id in slow_tasks:
+                frame = frames.get(thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+                try:
+                    self.__callback(PyNotiSlowTask(queue, str(task_id), fn, run_time, stack))
+                except Exception as e:
+                    logging.error(e)
@@ -29,7 +29,5 @@ def RunInThread(
     return event
 
 
-def Wait(event: threading.Event):
-    timeout = 5.0
-    while not event.is_set():
-        event.wait(timeout)
+def Wait(event: threading.Event, timeout: Optional[float] = None) -> bool:
+    return event.wait(timeout)
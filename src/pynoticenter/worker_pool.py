@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+
+class PyNotiWorkerPool:
+    """PyNotiWorkerPool, a fixed number of event loop threads shared by task queues. All function thread safety.
+
+    Each task queue is bound to one event loop of the pool, the least loaded one when it is created,
+    so the tasks of the queue keep their order while the thread count does not grow with the queue count.
+    """
+
+    def __init__(self, worker_count: Optional[int] = None):
+        count = worker_count if worker_count is not None and worker_count > 0 else (os.cpu_count() or 1)
+        self.__lock: threading.Lock = threading.Lock()
+        self.__runloops: List[asyncio.AbstractEventLoop] = [asyncio.new_event_loop() for _ in range(count)]
+        self.__loads: List[int] = [0] * count
+        self.__threads: List[threading.Thread] = [
+            threading.Thread(target=self.__worker_thread__, args=(i,), name=f"PyNotiWorker-{i}") for i in range(count)
+        ]
+        self.__is_started: bool = False
+        self.__is_shutdown: bool = False
+
+    @property
+    def worker_count(self) -> int:
+        return len(self.__runloops)
+
+    def acquire_runloop(self) -> asyncio.AbstractEventLoop:
+        with self.__lock:
+            if self.__is_shutdown:
+                raise ValueError("worker pool is shutdown.")
+            if not self.__is_started:
+                self.__is_started = True
+                for t in self.__threads:
+                    t.start()
+            index = self.__loads.index(min(self.__loads))
+            self.__loads[index] += 1
+            return self.__runloops[index]
+
+    def release_runloop(self, runloop: asyncio.AbstractEventLoop):
+        with self.__lock:
+            index = self.__runloops.index(runloop)
+            self.__loads[index] -= 1
+            if self.__is_shutdown and self.__loads[index] == 0:
+                runloop.call_soon_threadsafe(runloop.stop)
+
+    def shutdown(self, wait: bool = True, timeout: Optional[float] = None) -> bool:
+        """stop the event loops once all the task queues released them. return False if wait timeout."""
+        with self.__lock:
+            if self.__is_shutdown:
+                return True
+            self.__is_shutdown = True
+            if not self.__is_started:
+                return True
+            for index, runloop in enumerate(self.__runloops):
+                if self.__loads[index] == 0:
+                    runloop.call_soon_threadsafe(runloop.stop)
+        if not wait:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self.__threads:
+            t.join(None if deadline is None else max(deadline - time.monotonic(), 0))
+        return not any(t.is_alive() for t in self.__threads)
+
+    def __worker_thread__(self, index: int):
+        logging.info(f"WorkerPool[{index}]: worker thread begin.")
+        loop = self.__runloops[index]
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+            logging.info(f"WorkerPool[{index}]: worker thread end.")
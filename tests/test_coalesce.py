@@ -0,0 +1,82 @@
+import threading
+import time
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+def block_queue(center: PyNotiCenter, queue: str) -> threading.Event:
+    started_event = threading.Event()
+    release_event = threading.Event()
+
+    def block():
+        started_event.set()
+        release_event.wait(5)
+
+    center.post_task_to_task_queue(queue, block)
+    assert started_event.wait(5)
+    return release_event
+
+
+def test_coalesce_keeps_latest_args():
+    center = PyNotiCenter()
+    got = []
+    center.add_observer("e", got.append, options=PyNotiOptions(queue="q", coalesce=True))
+    release_event = block_queue(center, "q")
+    for i in range(100):
+        center.notify_observers("e", i)
+    release_event.set()
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [99]
+
+
+def test_reducer_merges_waiting_args():
+    center = PyNotiCenter()
+    got = []
+
+    def add(waiting, new):
+        return (waiting[0][0] + new[0][0],), {}
+
+    center.add_observer("e", got.append, options=PyNotiOptions(queue="q", reducer=add))
+    release_event = block_queue(center, "q")
+    for _ in range(10):
+        center.notify_observers("e", 1)
+    release_event.set()
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [10]
+
+
+def test_debounce_delivers_once_after_quiet_period():
+    center = PyNotiCenter()
+    got = []
+    center.add_observer("e", got.append, options=PyNotiOptions(queue="q", debounce=0.1))
+    begin_time = time.monotonic()
+    for i in range(5):
+        center.notify_observers("e", i)
+        time.sleep(0.02)
+    last_time = time.monotonic()
+    assert got == []
+    deadline = time.monotonic() + 5
+    while len(got) == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    delivered_time = time.monotonic()
+    center.shutdown(wait=True)
+    assert got == [4]
+    assert delivered_time - last_time >= 0.05
+    assert delivered_time - begin_time >= 0.1
+
+
+def test_coalesce_survives_observer_change_on_other_queue():
+    center = PyNotiCenter()
+    got = []
+    center.add_observer("e", got.append, options=PyNotiOptions(queue="q", coalesce=True))
+    release_event = block_queue(center, "q")
+    center.notify_observers("e", 1)
+    center.add_observer("e", lambda value: None, options=PyNotiOptions(queue="other"))
+    center.notify_observers("e", 2)
+    center.notify_observers("e", 3)
+    release_event.set()
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [3]
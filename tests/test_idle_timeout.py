@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+def worker_pid() -> int:
+    return os.getpid()
+
+
+def test_owned_executor_carries_over_idle_restarts():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", executor="process", workers=1, idle_timeout=0.1))
+    pids = set()
+    for _ in range(3):
+        pids.add(queue.submit_task(worker_pid).result(30))
+        # let the worker thread retire.
+        time.sleep(0.3)
+    center.shutdown(wait=True)
+    assert len(pids) == 1
+    assert os.getpid() not in pids
+
+
+async def current_thread() -> threading.Thread:
+    return threading.current_thread()
+
+
+def test_concurrent_queue_retires_after_running_task_finish():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", max_concurrency=2, idle_timeout=0.1))
+    worker_thread = queue.submit_task(current_thread).result(5)
+    # still running when the first idle check fires.
+    queue.post_task(time.sleep, 0.3)
+    worker_thread.join(2)
+    alive = worker_thread.is_alive()
+    center.shutdown(wait=True)
+    assert not alive
+
+
+def test_shutdown_after_idle_retire_stops_owned_executor():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", executor="thread", idle_timeout=0.1))
+    queue.post_task(time.sleep, 0.01)
+    # let the worker thread retire.
+    time.sleep(0.5)
+    center.shutdown(wait=True)
+    executor_threads = [t for t in threading.enumerate() if t.name.startswith("TaskQueue[q]")]
+    for t in executor_threads:
+        t.join(2)
+    assert not any(t.is_alive() for t in executor_threads)
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from pynoticenter import PyNotiCenter, PyNotiOptions, PyNotiOverflowPolicy, PyNotiQueueFullError
+
+
+def noop(*args):
+    pass
+
+
+def make_queue(center: PyNotiCenter, policy: PyNotiOverflowPolicy, **kwargs):
+    return center.create_task_queue(
+        PyNotiOptions(queue="q", max_pending=2, overflow_policy=policy, overflow_timeout=2, **kwargs)
+    )
+
+
+def block_worker(queue):
+    started_event = threading.Event()
+    release_event = threading.Event()
+
+    def block():
+        started_event.set()
+        release_event.wait(5)
+
+    queue.post_task(block)
+    assert started_event.wait(5)
+    return release_event
+
+
+def test_reject_raises_when_full():
+    center = PyNotiCenter()
+    queue = make_queue(center, PyNotiOverflowPolicy.REJECT)
+    release_event = block_worker(queue)
+    queue.post_task(noop)
+    with pytest.raises(PyNotiQueueFullError):
+        queue.post_task(noop)
+    release_event.set()
+    center.shutdown(wait=True)
+
+
+def test_drop_newest_and_drop_oldest():
+    for policy, expected in ((PyNotiOverflowPolicy.DROP_NEWEST, [1]), (PyNotiOverflowPolicy.DROP_OLDEST, [2])):
+        center = PyNotiCenter()
+        queue = make_queue(center, policy)
+        got = []
+        release_event = block_worker(queue)
+        queue.post_task(got.append, 1)
+        queue.post_task(got.append, 2)
+        assert queue.task_count == 2
+        release_event.set()
+        center.wait_until_task_complete(timeout=5)
+        center.shutdown(wait=True)
+        assert got == expected
+
+
+def test_coalesce_replaces_args_of_waiting_task():
+    center = PyNotiCenter()
+    queue = make_queue(center, PyNotiOverflowPolicy.COALESCE)
+    got = []
+    release_event = block_worker(queue)
+    queue.post_task(got.append, 1)
+    queue.post_task(got.append, 2)
+    queue.post_task(got.append, 3)
+    release_event.set()
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [3]
+
+
+def test_block_waits_for_room():
+    center = PyNotiCenter()
+    queue = make_queue(center, PyNotiOverflowPolicy.BLOCK)
+    release_event = block_worker(queue)
+    queue.post_task(noop)
+    threading.Timer(0.1, release_event.set).start()
+    begin_time = time.monotonic()
+    queue.post_task(noop)
+    assert 0.05 < time.monotonic() - begin_time < 2
+    center.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("executor", ["loop", "thread"])
+def test_block_raises_when_posted_from_own_task(executor: str):
+    center = PyNotiCenter()
+    queue = make_queue(center, PyNotiOverflowPolicy.BLOCK, executor=executor)
+    errors = []
+
+    def producer():
+        try:
+            for _ in range(3):
+                queue.post_task(noop)
+        except PyNotiQueueFullError as e:
+            errors.append(e)
+
+    begin_time = time.monotonic()
+    queue.submit_task(producer).result(5)
+    assert time.monotonic() - begin_time < 1
+    assert len(errors) == 1
+    center.shutdown(wait=True)
+
+
+def test_observer_options_bound_the_notification_queue():
+    center = PyNotiCenter()
+    started_event = threading.Event()
+    release_event = threading.Event()
+    got = []
+
+    def on_notify(value: int):
+        started_event.set()
+        release_event.wait(5)
+        got.append(value)
+
+    options = PyNotiOptions(queue="obs", max_pending=2, overflow_policy=PyNotiOverflowPolicy.DROP_NEWEST)
+    center.add_observer("e", on_notify, options=options)
+    center.notify_observers("e", 0)
+    assert started_event.wait(5)
+    for i in range(1, 50):
+        center.notify_observers("e", i)
+    task_count = center.get_task_queue("obs").task_count
+    release_event.set()
+    center.shutdown(wait=True)
+    assert task_count == 2
+    assert got == [0, 1]
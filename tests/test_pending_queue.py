@@ -0,0 +1,57 @@
+from collections import deque
+
+from pynoticenter.pending_queue import PyNotiPendingQueue
+from pynoticenter.task import PyNotiTask, PyNotiTaskConfig
+
+
+def make_task(task_id: int, priority: int = 0) -> PyNotiTask:
+    task = PyNotiTask(task_id, 0, None, PyNotiTaskConfig(), (), {})
+    task.set_priority(priority)
+    return task
+
+
+def task_ids(tasks) -> list:
+    return [task.task_id for task in tasks]
+
+
+def test_higher_priority_first_and_fifo_within_level():
+    queue = PyNotiPendingQueue()
+    for task_id, priority in [(1, 0), (2, 5), (3, 0), (4, 10), (5, 5), (6, -1)]:
+        queue.append(make_task(task_id, priority), priority)
+    assert len(queue) == 6
+    assert queue.depth() == {0: 2, 5: 2, 10: 1, -1: 1}
+    order = []
+    while len(queue) > 0:
+        order.extend(task_ids(queue.pop_batch()))
+    assert order == [4, 2, 5, 1, 3, 6]
+    assert task_ids(queue.pop_batch()) == []
+
+
+def test_pop_batch_takes_at_most_max_batch():
+    queue = PyNotiPendingQueue()
+    for task_id in range(1, 6):
+        queue.append(make_task(task_id))
+    assert task_ids(queue.pop_batch(2)) == [1, 2]
+    assert task_ids(queue.pop_batch(2)) == [3, 4]
+    assert task_ids(queue.pop_batch(2)) == [5]
+    assert len(queue) == 0
+
+
+def test_push_front_keeps_order_and_has_higher_priority():
+    queue = PyNotiPendingQueue()
+    for task_id in range(1, 5):
+        queue.append(make_task(task_id))
+    batch = queue.pop_batch()
+    batch.popleft()
+    queue.append(make_task(5))
+    queue.append(make_task(6, 10), 10)
+    assert queue.has_higher_priority(0)
+    assert not queue.has_higher_priority(10)
+    queue.push_front(batch, 0)
+    assert len(queue) == 5
+    assert task_ids(queue.pop_batch()) == [6]
+    assert task_ids(queue.pop_batch()) == [2, 3, 4, 5]
+    # give back to an empty level.
+    queue.push_front(deque([make_task(7, 3)]), 3)
+    assert queue.depth() == {3: 1}
+    assert not queue.has_higher_priority(3)
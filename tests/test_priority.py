@@ -0,0 +1,30 @@
+import threading
+from typing import Any, List
+
+import pytest
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 2])
+def test_high_priority_task_preempts_draining_backlog(max_concurrency: int):
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", max_concurrency=max_concurrency, executor="loop"))
+    order: List[Any] = []
+    release_event = threading.Event()
+
+    def background(i: int):
+        if i == 0:
+            release_event.wait(5)
+        order.append(i)
+
+    queue.post_tasks([(background, (i,), {}) for i in range(200)])
+    queue.post_task(order.append, "ui", priority=10)
+    release_event.set()
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown()
+    assert len(order) == 201
+    # only the tasks already started run before the high priority one.
+    assert order.index("ui") <= max_concurrency
+    if max_concurrency == 1:
+        assert [i for i in order if i != "ui"] == list(range(200))
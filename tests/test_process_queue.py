@@ -0,0 +1,31 @@
+import time
+from typing import Tuple
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+def timed_sleep(seconds: float) -> Tuple[float, float]:
+    begin_time = time.time()
+    time.sleep(seconds)
+    return begin_time, time.time()
+
+
+def run_intervals(max_concurrency) -> list:
+    center = PyNotiCenter()
+    options = PyNotiOptions(queue="q", executor="process", workers=2, max_concurrency=max_concurrency)
+    queue = center.create_task_queue(options)
+    handles = [queue.submit_task(timed_sleep, 0.2) for _ in range(3)]
+    intervals = [handle.result(30) for handle in handles]
+    center.shutdown(wait=True)
+    return intervals
+
+
+def test_explicit_max_concurrency_one_keeps_process_queue_serial():
+    intervals = run_intervals(1)
+    for (_, end_time), (begin_time, _) in zip(intervals, intervals[1:]):
+        assert begin_time >= end_time
+
+
+def test_process_queue_runs_workers_tasks_by_default():
+    intervals = run_intervals(None)
+    assert intervals[1][0] < intervals[0][1]
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+def fast():
+    pass
+
+
+def test_finished_tasks_are_not_pending():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q"))
+    started_event = threading.Event()
+    release_event = threading.Event()
+
+    def slow():
+        started_event.set()
+        release_event.wait(5)
+
+    task_ids = queue.post_tasks([(fast, (), {})] * 5 + [(slow, (), {})])
+    assert started_event.wait(5)
+    assert queue.task_count == 1
+    # cancel a finished task is a no-op.
+    queue.cancel_task(task_ids[0])
+    assert queue.get_metrics().cancelled == 0
+    release_event.set()
+    center.shutdown(wait=True)
+
+
+def test_shutdown_report_only_lists_tasks_not_run():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q"))
+    started_event = threading.Event()
+
+    def slow():
+        started_event.set()
+        time.sleep(0.5)
+
+    queue.post_tasks([(fast, (), {})] * 5 + [(slow, (), {})])
+    queue.post_task(fast)
+    assert started_event.wait(5)
+    report = center.shutdown(wait=True, timeout=0.1)
+    assert not report.completed
+    dropped = {task.task_id: task for task in report.dropped_tasks}
+    assert len(dropped) == 2
+    assert dropped["6"].is_running
+    assert not dropped["7"].is_running
+    assert "fast" in dropped["7"].fn
+
+
+def test_executed_and_cancelled_add_up_to_posted():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q"))
+    queue.post_tasks([(fast, (), {})] * 20)
+    for _ in range(5):
+        queue.post_task_with_delay(60, fast)
+    queue.post_task(time.sleep, 0.05)
+    report = center.shutdown(wait=False)
+    # a task running at shutdown is not dropped, wait for it to return.
+    deadline = time.monotonic() + 5
+    metrics = queue.get_metrics()
+    while metrics.executed + metrics.cancelled < metrics.posted and time.monotonic() < deadline:
+        time.sleep(0.01)
+        metrics = queue.get_metrics()
+    assert metrics.posted == 26
+    assert metrics.executed + metrics.cancelled == metrics.posted
+    assert metrics.cancelled == len(report.dropped_tasks)
+
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q"))
+    queue.post_tasks([(fast, (), {})] * 20)
+    queue.post_task_with_delay(0.05, fast)
+    assert center.shutdown(wait=True).completed
+    metrics = queue.get_metrics()
+    assert metrics.posted == 21
+    assert metrics.executed == 21
+    assert metrics.cancelled == 0
@@ -0,0 +1,114 @@
+import asyncio
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+from pynoticenter.task import PyNotiTaskConfig, fanout_is_async
+
+
+def sync_fn():
+    pass
+
+
+async def async_fn():
+    pass
+
+
+def test_fanout_invokers_resolved_once_per_is_async():
+    config = PyNotiTaskConfig()
+    is_async = fanout_is_async([sync_fn, async_fn, sync_fn])
+    assert is_async == (False, True, False)
+    invokers = config.fanout_invokers(is_async)
+    assert invokers == (config.sync_invoker, config.async_invoker, config.sync_invoker)
+    assert config.fanout_invokers(is_async) is invokers
+
+
+def test_fanout_delivers_to_sync_and_async_observers():
+    center = PyNotiCenter()
+    got = []
+
+    async def on_async(value: int):
+        await asyncio.sleep(0)
+        got.append(("async", value))
+
+    options = PyNotiOptions(queue="q")
+    center.add_observer("e", lambda value: got.append(("sync", value)), options=options)
+    center.add_observer("e", on_async, options=options)
+    for i in range(3):
+        center.notify_observers("e", i)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [(kind, i) for i in range(3) for kind in ("sync", "async")]
+
+
+def test_preprocessor_chain_stops_at_the_first_handled():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q"))
+    calls = []
+
+    def first(fn, value):
+        calls.append(("first", value))
+        return False
+
+    async def second(fn, value):
+        calls.append(("second", value))
+        return value == 1
+
+    def third(fn, value):
+        calls.append(("third", value))
+        return False
+
+    for preprocessor in (first, second, third):
+        queue.add_preprocessor(preprocessor)
+    queue.post_task(lambda value: calls.append(("fn", value)), 0)
+    queue.post_task(lambda value: calls.append(("fn", value)), 1)
+    center.wait_until_task_complete(timeout=5)
+    assert calls == [
+        ("first", 0),
+        ("second", 0),
+        ("third", 0),
+        ("fn", 0),
+        ("first", 1),
+        ("second", 1),
+    ]
+
+    calls.clear()
+    queue.remove_preprocessor(second)
+    queue.post_task(lambda value: calls.append(("fn", value)), 1)
+    center.wait_until_task_complete(timeout=5)
+    assert calls == [("first", 1), ("third", 1), ("fn", 1)]
+
+    calls.clear()
+    queue.set_preprocessor(None)
+    queue.post_task(lambda value: calls.append(("fn", value)), 2)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert calls == [("fn", 2)]
+
+
+def test_fn_with_task_id_passes_the_posted_task_id():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", fn_with_task_id=True))
+    got = []
+
+    def preprocessor(fn, task_id: str, value: int):
+        got.append(("preprocessor", task_id, value))
+        return False
+
+    def on_sync(task_id: str, value: int):
+        got.append(("sync", task_id, value))
+
+    async def on_async(task_id: str, value: int):
+        await asyncio.sleep(0)
+        got.append(("async", task_id, value))
+
+    queue.add_preprocessor(preprocessor)
+    sync_id = queue.post_task(on_sync, 1)
+    async_id = queue.post_task(on_async, 2)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert isinstance(sync_id, str)
+    assert got == [
+        ("preprocessor", sync_id, 1),
+        ("sync", sync_id, 1),
+        ("preprocessor", async_id, 2),
+        ("async", async_id, 2),
+    ]
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from typing import Iterator, List, Tuple
+
+import pytest
+
+from pynoticenter.timer_wheel import PyNotiTimerWheel
+
+
+@pytest.fixture
+def runloop() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_fire_in_deadline_order_and_never_early(runloop: asyncio.AbstractEventLoop):
+    wheel = PyNotiTimerWheel(runloop, resolution=0.01, slot_count=16)
+    fired: List[Tuple[str, float]] = []
+    done_event = threading.Event()
+    delays = {"c": 0.15, "a": 0.05, "b": 0.1, "a2": 0.05}
+
+    def on_fire(name: str, arm_time: float):
+        fired.append((name, time.monotonic() - arm_time))
+        if len(fired) == len(delays):
+            done_event.set()
+
+    for name, delay in delays.items():
+        wheel.arm(delay, on_fire, name, time.monotonic())
+    assert done_event.wait(5)
+    # same deadline keeps arm order.
+    assert [name for name, _ in fired] == ["a", "a2", "b", "c"]
+    for name, elapsed in fired:
+        assert elapsed >= delays[name]
+    assert wheel.timer_count == 0
+
+
+def test_cancelled_timer_does_not_fire(runloop: asyncio.AbstractEventLoop):
+    wheel = PyNotiTimerWheel(runloop, resolution=0.01)
+    fired: List[str] = []
+    done_event = threading.Event()
+    handle = wheel.arm(0.05, fired.append, "cancelled")
+    wheel.arm(0.1, lambda: done_event.set())
+    assert wheel.timer_count == 2
+    handle.cancel()
+    assert handle.cancelled()
+    assert wheel.timer_count == 1
+    # cancel twice is a no-op.
+    handle.cancel()
+    assert wheel.timer_count == 1
+    assert done_event.wait(5)
+    assert fired == []
+
+
+def test_delay_longer_than_one_revolution(runloop: asyncio.AbstractEventLoop):
+    # one revolution is 8 slots * 0.01s, the timer goes around the wheel several times before it fires.
+    wheel = PyNotiTimerWheel(runloop, resolution=0.01, slot_count=8)
+    fired: List[Tuple[str, float]] = []
+    done_event = threading.Event()
+    arm_time = time.monotonic()
+
+    def on_fire(name: str):
+        fired.append((name, time.monotonic() - arm_time))
+        if name == "long":
+            done_event.set()
+
+    wheel.arm(0.25, on_fire, "long")
+    wheel.arm(0.02, on_fire, "short")
+    assert done_event.wait(5)
+    assert [name for name, _ in fired] == ["short", "long"]
+    assert fired[1][1] >= 0.25
+
+
+def test_invalid_arguments(runloop: asyncio.AbstractEventLoop):
+    with pytest.raises(ValueError):
+        PyNotiTimerWheel(runloop, resolution=0)
+    with pytest.raises(ValueError):
+        PyNotiTimerWheel(runloop, slot_count=0)
+
+
+def test_cancelled_far_timers_leave_the_wheel_idle(runloop: asyncio.AbstractEventLoop):
+    wheel = PyNotiTimerWheel(runloop, resolution=0.01, slot_count=8)
+    handles = [wheel.arm(60 + i, lambda: None) for i in range(100)]
+    for handle in handles:
+        handle.cancel()
+    assert wheel.timer_count == 0
+    # the wheel stops, a new timer starts it again and fires on time.
+    time.sleep(0.05)
+    done_event = threading.Event()
+    arm_time = time.monotonic()
+    wheel.arm(0.2, done_event.set)
+    assert done_event.wait(5)
+    elapsed = time.monotonic() - arm_time
+    assert 0.2 <= elapsed < 1
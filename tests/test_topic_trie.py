@@ -0,0 +1,99 @@
+import pytest
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+from pynoticenter.topic_trie import PyNotiTopicTrie, is_topic_pattern
+
+
+def make_trie(*patterns: str) -> PyNotiTopicTrie:
+    trie = PyNotiTopicTrie()
+    for pattern in patterns:
+        trie.insert(pattern, pattern)
+    return trie
+
+
+def test_is_topic_pattern():
+    assert is_topic_pattern("order.*")
+    assert is_topic_pattern("market.#")
+    assert not is_topic_pattern("order.created")
+    assert not is_topic_pattern("order.c*")
+
+
+def test_one_segment_wildcard():
+    trie = make_trie("order.*", "order.*.paid", "*.created")
+    assert sorted(trie.match("order.created")) == ["*.created", "order.*"]
+    assert trie.match("order.1.paid") == ["order.*.paid"]
+    assert trie.match("order") == []
+    assert trie.match("order.a.b") == []
+
+
+def test_any_segments_wildcard_matches_zero_or_more():
+    trie = make_trie("market.#", "#", "market.#.close")
+    assert sorted(trie.match("market")) == ["#", "market.#"]
+    assert sorted(trie.match("market.a.b.c")) == ["#", "market.#"]
+    assert sorted(trie.match("market.close")) == ["#", "market.#", "market.#.close"]
+    assert sorted(trie.match("market.x.y.close")) == ["#", "market.#", "market.#.close"]
+    assert trie.match("stock") == ["#"]
+
+
+def test_no_duplicate_results():
+    # "a.#.#" and "#.b" reach the same pattern through several paths.
+    trie = make_trie("a.#.#", "#.b", "#.#")
+    result = trie.match("a.b")
+    assert sorted(result) == ["#.#", "#.b", "a.#.#"]
+    assert len(result) == len(set(result))
+
+
+def test_remove_prunes_and_counts():
+    trie = make_trie("a.*", "a.b.c")
+    assert len(trie) == 2
+    trie.insert("a.*", "replaced")
+    assert len(trie) == 2
+    assert trie.match("a.x") == ["replaced"]
+    trie.remove("a.b.c")
+    trie.remove("a.b.c")
+    trie.remove("not.there")
+    assert len(trie) == 1
+    assert trie.match("a.b.c") == []
+    trie.remove("a.*")
+    assert len(trie) == 0
+    assert trie.match("a.x") == []
+
+
+def test_removing_the_last_pattern_observer_restores_exact_match(monkeypatch: pytest.MonkeyPatch):
+    center = PyNotiCenter()
+    got = []
+
+    def on_pattern(value: int):
+        got.append(("pattern", value))
+
+    def on_exact(value: int):
+        got.append(("exact", value))
+
+    options = PyNotiOptions(queue="q")
+    center.add_observer("order.*", on_pattern, options=options)
+    center.add_observer("order.created", on_exact, options=options)
+    center.notify_observers("order.created", 1)
+    center.notify_observers("order.paid", 2)
+    center.wait_until_task_complete(timeout=5)
+    assert got == [("exact", 1), ("pattern", 1), ("pattern", 2)]
+
+    got.clear()
+    center.remove_observer("order.*", on_pattern)
+
+    def fail_match(self, topic: str):
+        raise AssertionError(f"topic {topic} matched by the trie")
+
+    monkeypatch.setattr(PyNotiTopicTrie, "match", fail_match)
+    center.notify_observers("order.created", 3)
+    with pytest.raises(ValueError):
+        center.notify_observers("order.paid", 4)
+    center.wait_until_task_complete(timeout=5)
+    assert got == [("exact", 3)]
+
+    monkeypatch.undo()
+    got.clear()
+    center.add_observer("order.*", on_pattern, options=options)
+    center.notify_observers("order.paid", 5)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [("pattern", 5)]
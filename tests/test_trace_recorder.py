@@ -0,0 +1,48 @@
+import asyncio
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+from pynoticenter.trace_recorder import (
+    PYNOTI_TRACE_FINISH,
+    PYNOTI_TRACE_POST,
+    PYNOTI_TRACE_START,
+    PyNotiTraceRecorder,
+)
+
+
+def phases(trace: dict) -> list:
+    return [event["ph"] for event in trace["traceEvents"] if event["ph"] != "M"]
+
+
+def test_overlapping_tasks_are_complete_slices():
+    center = PyNotiCenter()
+    queue = center.create_task_queue(PyNotiOptions(queue="q", max_concurrency=2))
+    recorder = center.start_trace_recording()
+
+    async def work():
+        await asyncio.sleep(0.05)
+
+    queue.post_task(work)
+    queue.post_task(work)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    trace = recorder.to_chrome_trace()
+    slices = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert len(slices) == 2
+    # both run on the queue event loop thread at the same time.
+    assert slices[0]["tid"] == slices[1]["tid"]
+    assert slices[1]["ts"] < slices[0]["ts"] + slices[0]["dur"]
+    assert all(event["dur"] >= 50000 for event in slices)
+    assert "B" not in phases(trace) and "E" not in phases(trace)
+
+
+def test_wrapped_buffer_leaves_no_orphan_slices():
+    recorder = PyNotiTraceRecorder(capacity=3)
+    recorder.record(PYNOTI_TRACE_POST, "q", 1, "fn")
+    recorder.record(PYNOTI_TRACE_START, "q", 1, "fn")
+    recorder.record(PYNOTI_TRACE_POST, "q", 2, "fn")
+    recorder.record(PYNOTI_TRACE_FINISH, "q", 1, "fn")
+    recorder.record(PYNOTI_TRACE_START, "q", 2, "fn")
+    # the start of task 1 was overwritten, task 2 is still running.
+    assert phases(recorder.to_chrome_trace()) == ["i", "s", "i"]
+    recorder.record(PYNOTI_TRACE_FINISH, "q", 2, "fn")
+    assert phases(recorder.to_chrome_trace()) == ["X", "f"]
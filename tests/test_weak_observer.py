@@ -0,0 +1,37 @@
+import gc
+import weakref
+
+from pynoticenter import PyNotiCenter, PyNotiOptions
+
+
+class Receiver:
+    def __init__(self, got: list):
+        self.got = got
+
+    def on_event(self, value: int):
+        self.got.append(value)
+
+
+def test_weak_observer_is_purged_after_receiver_collected():
+    center = PyNotiCenter()
+    got: list = []
+    options = PyNotiOptions(queue="q")
+    receivers = [Receiver(got) for _ in range(10)]
+    for receiver in receivers:
+        center.add_observer("e", receiver.on_event, receiver, options=options, weak=True)
+    strong = Receiver(got)
+    center.add_observer("e", strong.on_event, strong, options=options)
+    center.notify_observers("e", 1)
+    center.wait_until_task_complete(timeout=5)
+    assert len(got) == 11
+
+    refs = [weakref.ref(receiver) for receiver in receivers]
+    del receivers, receiver
+    gc.collect()
+    # the center holds no strong reference to a weak observer.
+    assert all(ref() is None for ref in refs)
+    got.clear()
+    center.notify_observers("e", 2)
+    center.wait_until_task_complete(timeout=5)
+    center.shutdown(wait=True)
+    assert got == [2]
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from typing import Dict, List
+
+import pytest
+
+from pynoticenter import PyNotiCenter, PyNotiOptions, PyNotiOverflowPolicy, PyNotiQueueFullError
+
+
+def worker_threads() -> List[threading.Thread]:
+    return [t for t in threading.enumerate() if t.name.startswith("PyNotiWorker-")]
+
+
+def test_each_queue_keeps_order_with_more_queues_than_workers():
+    center = PyNotiCenter(worker_threads=2)
+    got: Dict[int, list] = {i: [] for i in range(50)}
+
+    async def append_async(out: list, value: int):
+        await asyncio.sleep(0)
+        out.append(value)
+
+    queues = [center.create_task_queue(PyNotiOptions(queue=f"q{i}")) for i in range(50)]
+    for value in range(20):
+        for i, queue in enumerate(queues):
+            if value % 2 == 0:
+                queue.post_task(got[i].append, value)
+            else:
+                queue.post_task(append_async, got[i], value)
+    center.wait_until_task_complete(timeout=10)
+    center.shutdown(wait=True)
+    assert all(out == list(range(20)) for out in got.values())
+
+
+def test_thread_count_stays_at_worker_threads():
+    center = PyNotiCenter(worker_threads=2)
+    center.create_task_queue(PyNotiOptions(queue="first")).submit_task(lambda: None).result(5)
+    thread_count = threading.active_count()
+    for i in range(100):
+        center.post_task_to_task_queue(f"q{i}", lambda: None)
+    center.wait_until_task_complete(timeout=10)
+    assert len(worker_threads()) == 2
+    assert threading.active_count() == thread_count
+    center.shutdown(wait=True)
+
+
+def test_shutdown_stops_the_pool_threads():
+    center = PyNotiCenter(worker_threads=2)
+    for i in range(10):
+        center.post_task_to_task_queue(f"q{i}", lambda: None)
+    center.wait_until_task_complete(timeout=10)
+    # a queue released before shutdown gives its event loop back first.
+    center.release_task_queue("q0", wait=True)
+    threads = worker_threads()
+    report = center.shutdown(wait=True, timeout=5)
+    assert report.completed
+    assert len(threads) == 2
+    assert not any(t.is_alive() for t in threads)
+
+
+def test_block_raises_when_the_full_queue_shares_the_event_loop():
+    # one worker, every queue runs on the same event loop, blocking it would never free room.
+    center = PyNotiCenter(worker_threads=1)
+    options = PyNotiOptions(queue="bounded", max_pending=1, overflow_policy=PyNotiOverflowPolicy.BLOCK)
+    bounded_queue = center.create_task_queue(options)
+    producer_queue = center.create_task_queue(PyNotiOptions(queue="producer"))
+
+    def produce():
+        bounded_queue.post_task(lambda: None)
+        with pytest.raises(PyNotiQueueFullError):
+            bounded_queue.post_task(lambda: None)
+
+    producer_queue.submit_task(produce).result(5)
+    center.shutdown(wait=True)